@@ -0,0 +1,33 @@
+"""transactions keyset pagination index
+
+Revision ID: a1c3e5f7b901
+Revises: 8d563ec9b845
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b901'
+down_revision: Union[str, Sequence[str], None] = '8d563ec9b845'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_transactions_user_created_tx',
+        'transactions',
+        ['create_userid', sa.text('created_at DESC'), sa.text('transaction_id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_created_tx', table_name='transactions')
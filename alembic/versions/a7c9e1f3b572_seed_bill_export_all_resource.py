@@ -0,0 +1,94 @@
+"""seed bill:export_all button resource and grant it to admin
+
+Revision ID: a7c9e1f3b572
+Revises: f6b8d0e2a461
+Create Date: 2026-10-18 09:12:40.318265
+
+"""
+import logging
+from typing import Sequence, Union
+from uuid import uuid4
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f3b572'
+down_revision: Union[str, Sequence[str], None] = 'f6b8d0e2a461'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+EXPORT_ALL_CODE = 'bill:export_all'
+# 账单菜单：优先取已有账单按钮的父菜单，其次按菜单编码查找
+BILL_SIBLING_CODES = ('bill:delete',)
+BILL_MENU_CODES = ('bill',)
+ADMIN_ROLE_CODE = 'admin'
+
+
+def _bump_permission_version() -> None:
+    """
+    通知运行中的 worker 重新加载权限索引；Redis 不可达时提示手动执行脚本
+    autocommit_block 会先提交前面的数据修改，保证 worker 看到新版本号时能读到新授权
+    """
+    with op.get_context().autocommit_block():
+        _incr_permission_version()
+
+
+def _incr_permission_version() -> None:
+    try:
+        from app.core.permissions import PERMISSION_VERSION_KEY
+        from app.db.redis_session import get_sync_redis_client
+
+        get_sync_redis_client().incr(PERMISSION_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"权限版本号更新失败，请手动执行 scripts/bump_permission_version.py: {e}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    bill_rid = bind.execute(sa.text(
+        "SELECT parent_id FROM resources WHERE rcode = ANY(:codes) AND parent_id IS NOT NULL LIMIT 1"
+    ), {"codes": list(BILL_SIBLING_CODES)}).scalar()
+    if bill_rid is None:
+        bill_rid = bind.execute(sa.text(
+            "SELECT rid FROM resources WHERE rcode = ANY(:codes) AND rtype = 'MENU' LIMIT 1"
+        ), {"codes": list(BILL_MENU_CODES)}).scalar()
+    if bill_rid is None:
+        # 按钮必须挂在菜单下（check_button_parent_required），没有账单菜单时无法初始化
+        logger.warning(f"未找到账单菜单，跳过 {EXPORT_ALL_CODE} 资源初始化")
+        return
+
+    bind.execute(sa.text("""
+        INSERT INTO resources (rid, rname, rcode, rtype, parent_id, sort, description, status)
+        VALUES (:rid, '全量导出', :code, 'BUTTON', :parent_id, 99, '管理端按用户分片导出全部交易', 1)
+        ON CONFLICT (rcode) DO NOTHING
+    """), {"rid": uuid4().hex, "code": EXPORT_ALL_CODE, "parent_id": bill_rid})
+
+    bind.execute(sa.text("""
+        INSERT INTO role_area_grants (role_id, area_id, rid, is_grant)
+        SELECT r.role_id, NULL, res.rid, 1
+        FROM roles r
+        JOIN resources res ON res.rcode = :code
+        WHERE lower(r.role_code) = :role_code
+          AND NOT EXISTS (
+              SELECT 1 FROM role_area_grants g
+              WHERE g.role_id = r.role_id AND g.rid = res.rid
+          )
+    """), {"code": EXPORT_ALL_CODE, "role_code": ADMIN_ROLE_CODE})
+
+    _bump_permission_version()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.text("""
+        DELETE FROM role_area_grants
+        WHERE rid IN (SELECT rid FROM resources WHERE rcode = :code)
+    """).bindparams(code=EXPORT_ALL_CODE))
+    op.execute(sa.text("DELETE FROM resources WHERE rcode = :code").bindparams(code=EXPORT_ALL_CODE))
+
+    _bump_permission_version()
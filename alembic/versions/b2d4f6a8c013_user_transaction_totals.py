@@ -0,0 +1,48 @@
+"""user transaction totals table
+
+Revision ID: b2d4f6a8c013
+Revises: a1c3e5f7b901
+Create Date: 2026-10-17 10:03:11.520847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c013'
+down_revision: Union[str, Sequence[str], None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_transaction_totals',
+    sa.Column('userid', sa.String(length=32), nullable=False),
+    sa.Column('total_transactions', sa.Integer(), nullable=False),
+    sa.Column('total_income', sa.Float(), nullable=False),
+    sa.Column('total_expense', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['userid'], ['users.userid'], ),
+    sa.PrimaryKeyConstraint('userid')
+    )
+    # 用现有明细回填汇总
+    op.execute("""
+        INSERT INTO user_transaction_totals (userid, total_transactions, total_income, total_expense)
+        SELECT
+            u.userid,
+            COUNT(t.transaction_id),
+            COALESCE(SUM(CASE WHEN t.type = 'INCOME' THEN t.amount ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN t.type = 'EXPENSE' THEN t.amount ELSE 0 END), 0)
+        FROM users u
+        LEFT JOIN transactions t ON t.create_userid = u.userid
+        GROUP BY u.userid
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_transaction_totals')
@@ -0,0 +1,42 @@
+"""global id key tables for partitioned transactions and fileassets
+
+Revision ID: b8d0f2a4c683
+Revises: a7c9e1f3b572
+Create Date: 2026-10-18 10:27:03.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitions import ID_KEY_TABLES, id_key_trigger_ddl
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c683'
+down_revision: Union[str, Sequence[str], None] = 'a7c9e1f3b572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, (key_table, id_col) in ID_KEY_TABLES.items():
+        op.create_table(key_table,
+        sa.Column(id_col, sa.String(length=32), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint(id_col)
+        )
+        # 用现有数据回填；历史上若已出现重复 id，这里会失败，需要先人工处理
+        op.execute(f'INSERT INTO {key_table} ({id_col}, created_at) SELECT {id_col}, created_at FROM {table}')
+        for stmt in id_key_trigger_ddl(table):
+            op.execute(stmt)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, (key_table, _) in ID_KEY_TABLES.items():
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_sync_keys ON {table}')
+        op.execute(f'DROP FUNCTION IF EXISTS {table}_sync_keys()')
+        op.drop_table(key_table)
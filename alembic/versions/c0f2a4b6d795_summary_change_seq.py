@@ -0,0 +1,28 @@
+"""add change_seq to user_transaction_totals
+
+Revision ID: c0f2a4b6d795
+Revises: b8d0f2a4c683
+Create Date: 2026-10-18 14:05:52.417630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0f2a4b6d795'
+down_revision: Union[str, Sequence[str], None] = 'b8d0f2a4c683'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_transaction_totals', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_transaction_totals', 'change_seq')
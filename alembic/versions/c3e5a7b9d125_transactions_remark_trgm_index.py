@@ -0,0 +1,37 @@
+"""transactions remark trigram index
+
+Revision ID: c3e5a7b9d125
+Revises: b2d4f6a8c013
+Create Date: 2026-10-17 10:41:52.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b9d125'
+down_revision: Union[str, Sequence[str], None] = 'b2d4f6a8c013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_transactions_remark_trgm',
+        'transactions',
+        ['remark'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'remark': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_remark_trgm', table_name='transactions')
+    # pg_trgm 扩展可能被其它对象使用，降级时不删除
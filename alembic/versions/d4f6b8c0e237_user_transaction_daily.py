@@ -0,0 +1,52 @@
+"""user transaction daily rollup table
+
+Revision ID: d4f6b8c0e237
+Revises: c3e5a7b9d125
+Create Date: 2026-10-17 14:22:40.318265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6b8c0e237'
+down_revision: Union[str, Sequence[str], None] = 'c3e5a7b9d125'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_transaction_daily',
+    sa.Column('userid', sa.String(length=32), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('type', postgresql.ENUM('INCOME', 'EXPENSE', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['userid'], ['users.userid'], ),
+    sa.PrimaryKeyConstraint('userid', 'day', 'type')
+    )
+    # 用现有明细回填，自然日按 STATS_TIMEZONE 划分，与应用侧增量维护一致
+    op.execute(sa.text("""
+        INSERT INTO user_transaction_daily (userid, day, type, total_count, total_amount)
+        SELECT
+            create_userid,
+            (created_at AT TIME ZONE :tz)::date,
+            type,
+            COUNT(*),
+            COALESCE(SUM(amount), 0)
+        FROM transactions
+        GROUP BY 1, 2, 3
+    """).bindparams(tz=settings.STATS_TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_transaction_daily')
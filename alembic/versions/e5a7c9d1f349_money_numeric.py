@@ -0,0 +1,89 @@
+"""store money as numeric(18, 2)
+
+Revision ID: e5a7c9d1f349
+Revises: d4f6b8c0e237
+Create Date: 2026-10-17 15:08:52.104736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d1f349'
+down_revision: Union[str, Sequence[str], None] = 'd4f6b8c0e237'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (表, 列)：所有金额列
+MONEY_COLUMNS = [
+    ('transactions', 'amount'),
+    ('user_transaction_totals', 'total_income'),
+    ('user_transaction_totals', 'total_expense'),
+    ('user_transaction_daily', 'total_amount'),
+]
+
+# 视图依赖 transactions.amount，改列类型前必须先删除，之后按 scripts/recreate_views.py 中的定义重建
+USER_TRANSACTION_SUMMARY_VIEW_SQL = """
+CREATE OR REPLACE VIEW user_transaction_summary AS
+SELECT
+    u.userid,
+    u.username,
+    COUNT(t.transaction_id) AS total_transactions,
+    SUM(CASE WHEN t.type = 'INCOME' THEN t.amount ELSE 0 END) AS total_income,
+    SUM(CASE WHEN t.type = 'EXPENSE' THEN t.amount ELSE 0 END) AS total_expense
+FROM users u
+LEFT JOIN transactions t ON t.create_userid = u.userid
+GROUP BY u.userid, u.username;
+"""
+
+
+def _alter_money(type_, using: str) -> None:
+    op.execute("DROP VIEW IF EXISTS user_transaction_summary")
+    for table, column in MONEY_COLUMNS:
+        op.alter_column(table, column, type_=type_, postgresql_using=using.format(column=column))
+    op.execute(USER_TRANSACTION_SUMMARY_VIEW_SQL)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 历史 float 值四舍五入到分
+    _alter_money(sa.Numeric(18, 2), "round({column}::numeric, 2)")
+    # 汇总是 float 累加出来的，改类型后按明细重新聚合一次，消除历史误差
+    op.execute("""
+        UPDATE user_transaction_totals s SET
+            total_income = a.total_income,
+            total_expense = a.total_expense
+        FROM (
+            SELECT
+                create_userid AS userid,
+                COALESCE(SUM(CASE WHEN type = 'INCOME' THEN amount ELSE 0 END), 0) AS total_income,
+                COALESCE(SUM(CASE WHEN type = 'EXPENSE' THEN amount ELSE 0 END), 0) AS total_expense
+            FROM transactions
+            GROUP BY create_userid
+        ) a
+        WHERE s.userid = a.userid
+    """)
+    op.execute(sa.text("""
+        UPDATE user_transaction_daily d SET total_amount = a.total_amount
+        FROM (
+            SELECT
+                create_userid AS userid,
+                (created_at AT TIME ZONE :tz)::date AS day,
+                type,
+                SUM(amount) AS total_amount
+            FROM transactions
+            GROUP BY 1, 2, 3
+        ) a
+        WHERE d.userid = a.userid AND d.day = a.day AND d.type = a.type
+    """).bindparams(tz=settings.STATS_TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _alter_money(sa.Float(), "{column}::double precision")
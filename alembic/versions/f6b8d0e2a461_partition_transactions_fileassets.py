@@ -0,0 +1,167 @@
+"""partition transactions and fileassets by created_at month
+
+Revision ID: f6b8d0e2a461
+Revises: e5a7c9d1f349
+Create Date: 2026-10-17 16:41:05.772913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.db.partitions import PARTITIONED_TABLES, ensure_partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e2a461'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9d1f349'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 视图依赖 transactions，重建表前删除、完成后按 scripts/recreate_views.py 中的定义重建
+USER_TRANSACTION_SUMMARY_VIEW_SQL = """
+CREATE OR REPLACE VIEW user_transaction_summary AS
+SELECT
+    u.userid,
+    u.username,
+    COUNT(t.transaction_id) AS total_transactions,
+    SUM(CASE WHEN t.type = 'INCOME' THEN t.amount ELSE 0 END) AS total_income,
+    SUM(CASE WHEN t.type = 'EXPENSE' THEN t.amount ELSE 0 END) AS total_expense
+FROM users u
+LEFT JOIN transactions t ON t.create_userid = u.userid
+GROUP BY u.userid, u.username;
+"""
+
+# 各表旧索引，改名后随旧表一起删除，避免与新表索引重名
+OLD_INDEXES = {
+    'transactions': [
+        'ix_transactions_create_userid',
+        'ix_transactions_transaction_id',
+        'ix_transactions_user_created_tx',
+        'ix_transactions_remark_trgm',
+    ],
+    'fileassets': [
+        'ix_fileassets_business_id',
+        'ix_fileassets_fileid',
+        'ix_fileassets_userid',
+    ],
+}
+
+
+def _columns(table: str) -> list:
+    if table == 'transactions':
+        return [
+            sa.Column('transaction_id', sa.String(length=32), nullable=False),
+            sa.Column('create_userid', sa.String(length=32), nullable=False),
+            sa.Column('update_userid', sa.String(length=32), nullable=True),
+            sa.Column('amount', sa.Numeric(18, 2), nullable=False),
+            sa.Column('type', postgresql.ENUM('INCOME', 'EXPENSE', name='transactiontype', create_type=False), nullable=False),
+            sa.Column('remark', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['create_userid'], ['users.userid'], ),
+            sa.ForeignKeyConstraint(['update_userid'], ['users.userid'], ),
+        ]
+    return [
+        sa.Column('fileid', sa.String(length=32), nullable=False),
+        sa.Column('filepath', sa.String(length=255), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('category', sa.String(length=20), nullable=True),
+        sa.Column('business_id', sa.String(length=32), nullable=False),
+        sa.Column('userid', sa.String(length=32), nullable=False),
+        sa.Column('status', postgresql.ENUM('ACTIVE', 'QUARANTINE', 'DELETED', 'MISSING', name='filestatus', create_type=False), nullable=False),
+        sa.Column('update_userid', sa.String(length=32), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['userid'], ['users.userid'], ),
+    ]
+
+
+def _pk(table: str) -> list:
+    return ['transaction_id', 'created_at'] if table == 'transactions' else ['fileid', 'created_at']
+
+
+def _create_indexes(table: str, unique_id: bool = False) -> None:
+    # 分区表上的唯一索引必须包含分区键，业务 id 的唯一性改由 uuid 生成保证
+    if table == 'transactions':
+        op.create_index(op.f('ix_transactions_create_userid'), 'transactions', ['create_userid'], unique=False)
+        op.create_index(op.f('ix_transactions_transaction_id'), 'transactions', ['transaction_id'], unique=unique_id)
+        op.create_index(
+            'ix_transactions_user_created_tx',
+            'transactions',
+            ['create_userid', sa.text('created_at DESC'), sa.text('transaction_id DESC')],
+            unique=False,
+        )
+        op.create_index(
+            'ix_transactions_remark_trgm',
+            'transactions',
+            ['remark'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'remark': 'gin_trgm_ops'},
+        )
+    else:
+        op.create_index(op.f('ix_fileassets_business_id'), 'fileassets', ['business_id'], unique=False)
+        op.create_index(op.f('ix_fileassets_fileid'), 'fileassets', ['fileid'], unique=unique_id)
+        op.create_index(op.f('ix_fileassets_userid'), 'fileassets', ['userid'], unique=False)
+
+
+def _rename_old(table: str) -> str:
+    old = f'{table}_unpartitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    for index in OLD_INDEXES[table]:
+        op.execute(f'ALTER INDEX IF EXISTS {index} RENAME TO {index}_old')
+    return old
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.execute("DROP VIEW IF EXISTS user_transaction_summary")
+
+    for table in PARTITIONED_TABLES:
+        old = _rename_old(table)
+        op.create_table(
+            table,
+            *_columns(table),
+            sa.PrimaryKeyConstraint(*_pk(table)),
+            postgresql_partition_by='RANGE (created_at)',
+        )
+        # 从最早一条数据所在月份开始建分区，之后由定时任务滚动补建
+        # 分区边界按 UTC 写入，月份也按 UTC 计算，不受会话时区影响
+        first = bind.execute(sa.text(f"SELECT min(created_at) AT TIME ZONE 'UTC' FROM {old}")).scalar()
+        ensure_partitions(bind, settings.PARTITION_MONTHS_AHEAD, since=first.date() if first else None, tables=[table])
+
+        columns = ', '.join(c.name for c in _columns(table) if isinstance(c, sa.Column))
+        op.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}')
+        op.drop_table(old)
+        _create_indexes(table)
+
+    op.execute(USER_TRANSACTION_SUMMARY_VIEW_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP VIEW IF EXISTS user_transaction_summary")
+
+    for table in PARTITIONED_TABLES:
+        partitioned = f'{table}_partitioned'
+        op.execute(f'ALTER TABLE {table} RENAME TO {partitioned}')
+        op.execute(f'ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey')
+        for index in OLD_INDEXES[table]:
+            op.execute(f'ALTER INDEX IF EXISTS {index} RENAME TO {index}_old')
+
+        pk = _pk(table)[:1]
+        op.create_table(table, *_columns(table), sa.PrimaryKeyConstraint(*pk))
+        columns = ', '.join(c.name for c in _columns(table) if isinstance(c, sa.Column))
+        op.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {partitioned}')
+        # 删除父表会连同全部分区一起删除
+        op.drop_table(partitioned)
+        _create_indexes(table, unique_id=True)
+
+    op.execute(USER_TRANSACTION_SUMMARY_VIEW_SQL)
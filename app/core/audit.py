@@ -1,12 +1,14 @@
 # app/core/audit.py
 import functools
 from functools import wraps
+import inspect
 import json
 import time
 import traceback
 from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
@@ -32,6 +34,14 @@ Handler = Callable[..., Awaitable[Any]]
 GetDataFunc = Callable[..., Any]
 
 
+async def _save_audit_log(db, audit_data: Dict[str, Any], use_separate_session: bool) -> None:
+    # async 路由注入的是 AsyncSession，需要走异步保存
+    if isinstance(db, AsyncSession):
+        await audit_service.save_audit_log_async(db, audit_data, use_separate_session=use_separate_session)
+    else:
+        audit_service.save_audit_log(db, audit_data, use_separate_session=use_separate_session)
+
+
 async def _call_maybe_async(func: Optional[GetDataFunc], *args, **kwargs) -> Any:
     if not func:
         return None
@@ -84,7 +94,7 @@ def audit_log(
         async def wrapper(*args, **kwargs) -> Any:
             # 1. 提取关键对象
             request: Optional[Request] = kwargs.get("request")
-            db: Optional[Session] = kwargs.get("db")
+            db: Optional[Union[Session, AsyncSession]] = kwargs.get("db")
             current_user = kwargs.get("current_user")
 
             if strict_require_db and db is None and not use_separate_session:
@@ -135,9 +145,7 @@ def audit_log(
                 audit_data["operation_result"] = AuditResult.FAILURE
                 audit_data["audit_level"] = AuditLevel.WARNING  # 或 INFO，看你喜好
                 audit_data["error_message"] = e.message
-                audit_service.save_audit_log(
-                    db, audit_data, use_separate_session=use_separate_session
-                )
+                await _save_audit_log(db, audit_data, use_separate_session)
                 raise
             except Exception as e:
                 # 失败场景审计
@@ -151,9 +159,7 @@ def audit_log(
                 else:
                     audit_data["business_context"] = f"Error: {e}"
 
-                audit_service.save_audit_log(
-                    db, audit_data, use_separate_session=use_separate_session
-                )
+                await _save_audit_log(db, audit_data, use_separate_session)
                 raise
 
             # 4. 成功场景追加 after_data
@@ -162,9 +168,7 @@ def audit_log(
                 audit_data["after_data"] = audit_service.serialize_data(after_data)
             
             audit_data["operation_result"] = AuditResult.SUCCESS
-            audit_service.save_audit_log(
-                db, audit_data, use_separate_session=use_separate_session
-            )
+            await _save_audit_log(db, audit_data, use_separate_session)
 
             return result
                 
@@ -1,9 +1,11 @@
 # app/core/audit_service.py
+import asyncio
 import hashlib
 import json
 import time
 from typing import Any, Dict, Optional, Tuple
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_db
@@ -422,6 +424,32 @@ class AuditService:
                 except Exception:
                     pass
 
+    @staticmethod
+    async def save_audit_log_async(
+        db: Optional[AsyncSession],
+        audit_data: Dict[str, Any],
+        *,
+        use_separate_session: bool = False,
+    ) -> bool:
+        """
+        save_audit_log 的 AsyncSession 版本：
+        - 复用当前 AsyncSession 时在事件循环内 await commit
+        - 独立 Session 仍是同步实现，放到线程池执行，避免阻塞事件循环
+        """
+        if db is not None and not use_separate_session:
+            try:
+                db.add(AuditService.create_audit_log_from_data(audit_data))
+                await db.commit()
+                return True
+            except Exception:
+                try:
+                    await db.rollback()
+                except Exception:
+                    pass
+                return False
+
+        return await asyncio.to_thread(AuditService.save_audit_log, None, audit_data, use_separate_session=True)
+
 
 # 全局实例
 audit_service = AuditService()
@@ -0,0 +1,314 @@
+# app/core/cache.py
+"""
+Redis 读穿透缓存
+
+- 版本化 key：数据 key 为 {ns}:{id}:v{version}，写操作只需 INCR 版本号，旧数据自然过期
+- 击穿保护：同进程内按 key 串行，跨进程用 SET NX 锁，只有一个请求回源，其余等待结果
+- TTL 抖动：避免同一批 key 同时过期
+- 空值缓存：不存在的 id 短时间缓存占位符，防止穿透
+- 进程内 L1：可选的 LRU+TTL 本地缓存挡在 Redis 前面，跨 worker 通过 Redis pub/sub 失效
+"""
+import asyncio
+from collections import OrderedDict
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+import weakref
+
+from app.core.config import settings
+from app.core.logging import logger
+
+cache_logger = logger.bind(module="cache")
+
+NEGATIVE_SENTINEL = "__none__"
+
+# 只删除自己持有的锁
+_RELEASE_LOCK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+Loader = Callable[[], Awaitable[Optional[str]]]
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_MISSING = object()
+
+
+class LocalTTLCache:
+    """
+    进程内 LRU + TTL 缓存（单线程事件循环内使用，无需加锁）
+    epoch 在每次失效时递增：读取回源前记下 epoch，写入时若已变化说明期间发生过失效，放弃写入
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.epoch = 0
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, epoch: Optional[int] = None) -> None:
+        if epoch is not None and epoch != self.epoch:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        self.epoch += 1
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# namespace -> cache，用于把 pub/sub 失效消息分发到对应的本地缓存
+_registry: Dict[str, "ReadThroughCache"] = {}
+
+
+class ReadThroughCache:
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        *,
+        jitter: float = 0.1,
+        negative_ttl: int = 60,
+        version_ttl: int = 30 * 24 * 3600,
+        lock_ttl: int = 5,
+        lock_wait: float = 3.0,
+        local: Optional[LocalTTLCache] = None,
+        decode: Optional[Callable[[str], Any]] = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.jitter = jitter
+        self.negative_ttl = negative_ttl
+        # 版本号的存活时间必须远大于数据 TTL，版本号过期重置时旧数据早已过期
+        self.version_ttl = version_ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self._local_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # L1 中存放 decode 之后的值（例如编码好的响应 bytes），命中时不再做任何转换
+        self.local = local
+        self.decode = decode
+        _registry[namespace] = self
+
+    # ---------- key ----------
+
+    def version_key(self, entity_id: str) -> str:
+        return f"{self.namespace}:ver:{entity_id}"
+
+    def data_key(self, entity_id: str, version: str, variant: Optional[str] = None) -> str:
+        key = f"{self.namespace}:{entity_id}:v{version}"
+        return f"{key}:{variant}" if variant else key
+
+    def _lock_key(self, data_key: str) -> str:
+        return f"lock:{data_key}"
+
+    def _jittered(self, ttl: int) -> int:
+        return max(1, int(ttl * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+    def _local_lock(self, key: str) -> asyncio.Lock:
+        lock = self._local_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._local_locks[key] = lock
+        return lock
+
+    # ---------- 读 ----------
+
+    async def current_version(self, redis, entity_id: str) -> str:
+        return await redis.get(self.version_key(entity_id)) or "0"
+
+    async def get_or_load(self, redis, entity_id: str, loader: Loader, variant: Optional[str] = None) -> Any:
+        """
+        读取缓存，未命中时回源；返回 None 表示数据不存在
+        配置了 decode 时返回 decode 后的对象，否则返回字符串
+        variant：同一实体下的不同查询参数，共用实体的版本号，bump 时一起失效（不进 L1）
+        """
+        if self.local is None or variant:
+            return self._decode(await self._get_or_load_remote(redis, entity_id, loader, variant))
+
+        value = self.local.get(entity_id)
+        if value is not _MISSING:
+            return value
+
+        epoch = self.local.epoch
+        value = self._decode(await self._get_or_load_remote(redis, entity_id, loader))
+        self.local.set(entity_id, value, epoch=epoch)
+        return value
+
+    def _decode(self, raw: Optional[str]) -> Any:
+        if raw is None or self.decode is None:
+            return raw
+        return self.decode(raw)
+
+    async def _get_or_load_remote(
+        self,
+        redis,
+        entity_id: str,
+        loader: Loader,
+        variant: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        读取 Redis，未命中时回源
+        Redis 不可用时直接回源，不影响主流程
+        """
+        try:
+            key = self.data_key(entity_id, await self.current_version(redis, entity_id), variant)
+            cached = await redis.get(key)
+        except Exception as e:
+            cache_logger.warning(f"cache read failed, fallback to loader: {e}")
+            return await loader()
+
+        if cached is not None:
+            return None if cached == NEGATIVE_SENTINEL else cached
+
+        # 同进程内同一个 key 只放一个协程去抢锁/回源
+        async with self._local_lock(key):
+            try:
+                cached = await redis.get(key)
+            except Exception:
+                return await loader()
+            if cached is not None:
+                return None if cached == NEGATIVE_SENTINEL else cached
+            return await self._load_with_lock(redis, key, loader)
+
+    async def _load_with_lock(self, redis, key: str, loader: Loader) -> Optional[str]:
+        lock_key = self._lock_key(key)
+        token = uuid4().hex
+        try:
+            acquired = await redis.set(lock_key, token, nx=True, ex=self.lock_ttl)
+        except Exception:
+            return await loader()
+
+        if not acquired:
+            # 其它进程正在回源：短暂轮询等待结果，超时后自行回源
+            deadline = asyncio.get_running_loop().time() + self.lock_wait
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.05)
+                cached = await redis.get(key)
+                if cached is not None:
+                    return None if cached == NEGATIVE_SENTINEL else cached
+            return await loader()
+
+        try:
+            value = await loader()
+            await self._store(redis, key, value)
+            return value
+        finally:
+            try:
+                await redis.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+            except Exception:
+                pass
+
+    async def _store(self, redis, key: str, value: Optional[str]) -> None:
+        try:
+            if value is None:
+                await redis.set(key, NEGATIVE_SENTINEL, ex=self._jittered(self.negative_ttl))
+            else:
+                await redis.set(key, value, ex=self._jittered(self.ttl))
+        except Exception as e:
+            cache_logger.warning(f"cache write failed: {e}")
+
+    # ---------- 失效 ----------
+
+    async def bump(self, redis, entity_id: str) -> None:
+        """写操作提交后调用：版本号 +1，后续读取自动落到新 key，并通知各 worker 清理 L1"""
+        if self.local is not None:
+            self.local.invalidate(entity_id)
+        try:
+            vkey = self.version_key(entity_id)
+            p = redis.pipeline()
+            p.incr(vkey)
+            p.expire(vkey, self.version_ttl)
+            if self.local is not None:
+                p.publish(INVALIDATION_CHANNEL, f"{self.namespace}:{entity_id}")
+            await p.execute()
+        except Exception as e:
+            cache_logger.warning(f"cache bump failed: {e}")
+
+
+# ---------- 跨 worker 失效 ----------
+
+def _dispatch_invalidation(message: str) -> None:
+    namespace, _, entity_id = message.partition(":")
+    cache = _registry.get(namespace)
+    if cache is not None and cache.local is not None:
+        cache.local.invalidate(entity_id)
+
+
+def _clear_local_caches() -> None:
+    for cache in _registry.values():
+        if cache.local is not None:
+            cache.local.clear()
+
+
+async def run_invalidation_listener(redis) -> None:
+    """
+    订阅失效频道，在应用启动时作为后台任务运行
+    连接断开期间可能漏掉消息，重连前清空全部 L1，宁可多回源一次也不返回旧数据
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _dispatch_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            cache_logger.warning(f"cache invalidation listener error: {e}")
+            _clear_local_caches()
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+
+
+# 交易详情缓存：值为完整的 R[TransactionResponse] JSON，L1 中存 bytes 可直接作为响应体
+# namespace 随缓存内容格式变化而变化，避免读到旧格式的数据
+transaction_cache = ReadThroughCache(
+    "txdetail",
+    settings.TRANSACTION_CACHE_TTL,
+    negative_ttl=settings.TRANSACTION_CACHE_NEGATIVE_TTL,
+    local=LocalTTLCache(settings.TRANSACTION_L1_MAXSIZE, settings.TRANSACTION_L1_TTL),
+    decode=str.encode,
+)
+
+# 统计缓存：按用户维护版本号，(粒度, 区间, 类型) 作为 variant；用户任意一笔交易变化即整体失效
+stats_cache = ReadThroughCache("txstats", settings.TRANSACTION_STATS_CACHE_TTL)
+
+# 登录用户快照：entity 为 "{uid}:{sid}"，值为用户与有效角色的精简 JSON
+# 版本号与会话同寿命，会话结束前 bump 过的版本不会被重置
+principal_cache = ReadThroughCache(
+    "principal",
+    settings.PRINCIPAL_CACHE_TTL,
+    version_ttl=settings.SESSION_TTL_SECONDS,
+    local=LocalTTLCache(settings.PRINCIPAL_L1_MAXSIZE, settings.PRINCIPAL_L1_TTL),
+    decode=json.loads,
+)
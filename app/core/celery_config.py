@@ -47,6 +47,10 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab_from_string(settings.CLEANUP_CRON),
         'args': (False,),  # 不使用dry_run模式
     },
+    'maintain-partitions-daily': {
+        'task': 'app.tasks.celery_tasks.maintain_partitions_task',
+        'schedule': crontab_from_string(settings.PARTITION_CRON),
+    },
 }
 
 
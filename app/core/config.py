@@ -42,6 +42,51 @@ class Settings(BaseSettings):
     QUARANTINE_LIFETIME_DAYS: int = int(os.getenv("QUARANTINE_LIFETIME_DAYS", "7"))      # 隔离区保留天数
     CLEANUP_CRON: str = os.getenv("CLEANUP_CRON", "30 3 * * *")       # 每天 03:30
 
+    # ====== 分区 ======
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))           # 提前创建未来几个月的分区
+    PARTITION_RETENTION_MONTHS: int = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))   # 保留最近几个月的分区，0 表示不归档
+    PARTITION_ARCHIVE_SCHEMA: str = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")      # 归档分区移入的 schema
+    PARTITION_CRON: str = os.getenv("PARTITION_CRON", "15 4 * * *")   # 每天 04:15
+
+    # ====== 列表查询 ======
+    # ESTIMATE 模式下，执行计划估算行数超过该值时不再做精确计数
+    COUNT_ESTIMATE_THRESHOLD: int = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "10000"))
+    # 批量新增接口单次最多条数
+    BATCH_CREATE_MAX_ITEMS: int = int(os.getenv("BATCH_CREATE_MAX_ITEMS", "200"))
+    # 关键字搜索后端：auto（PostgreSQL 用 pg_trgm，其它数据库用 ILIKE）/ trgm / ilike
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "auto")
+
+    # ====== 统计 ======
+    # 日汇总表按该时区划分自然日
+    STATS_TIMEZONE: str = os.getenv("STATS_TIMEZONE", "Asia/Shanghai")
+    # 单次统计最多返回的时间桶数量
+    STATS_MAX_BUCKETS: int = int(os.getenv("STATS_MAX_BUCKETS", "1000"))
+
+    # ====== 导出 ======
+    # 流式导出每批从数据库取出的行数，决定导出任务的内存上限
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+    # 不超过该行数的 csv/ndjson 导出直接在请求内流式返回，超过则交给 Celery
+    EXPORT_INLINE_MAX_ROWS: int = int(os.getenv("EXPORT_INLINE_MAX_ROWS", "50000"))
+    # Parquet 每个 row group 的行数，攒够后才落盘
+    EXPORT_PARQUET_ROW_GROUP_SIZE: int = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "100000"))
+    # 导出文件保留秒数，数据未变化时在此期间内复用同一份文件
+    EXPORT_ARTIFACT_TTL: int = int(os.getenv("EXPORT_ARTIFACT_TTL", "86400"))
+    # 管理端全量导出的默认分片数，一般与 Celery worker 并发数相当
+    EXPORT_SHARD_COUNT: int = int(os.getenv("EXPORT_SHARD_COUNT", "8"))
+    # 增量导出向前重叠的秒数：容忍应用服务器时钟偏差与晚提交的写入，重叠部分由下游按 transaction_id 去重
+    EXPORT_SINCE_OVERLAP_SECONDS: int = int(os.getenv("EXPORT_SINCE_OVERLAP_SECONDS", "300"))
+
+    # ====== 缓存 ======
+    TRANSACTION_CACHE_TTL: int = int(os.getenv("TRANSACTION_CACHE_TTL", "1440"))          # 交易详情缓存秒数
+    TRANSACTION_CACHE_NEGATIVE_TTL: int = int(os.getenv("TRANSACTION_CACHE_NEGATIVE_TTL", "60"))  # 不存在的交易占位缓存秒数
+    TRANSACTION_L1_MAXSIZE: int = int(os.getenv("TRANSACTION_L1_MAXSIZE", "2048"))        # 进程内缓存条数上限
+    TRANSACTION_L1_TTL: int = int(os.getenv("TRANSACTION_L1_TTL", "30"))                  # 进程内缓存秒数（pub/sub 丢消息时的兜底）
+    TRANSACTION_STATS_CACHE_TTL: int = int(os.getenv("TRANSACTION_STATS_CACHE_TTL", "600"))   # 统计结果缓存秒数
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))              # 登录用户快照缓存秒数
+    PRINCIPAL_L1_MAXSIZE: int = int(os.getenv("PRINCIPAL_L1_MAXSIZE", "4096"))
+    PRINCIPAL_L1_TTL: int = int(os.getenv("PRINCIPAL_L1_TTL", "30"))
+    PERMISSION_CHECK_INTERVAL: float = float(os.getenv("PERMISSION_CHECK_INTERVAL", "1"))  # 权限索引版本号检查间隔（秒）
+
     # 签名配置
     SIGNING_KEYS: dict = json.loads(os.getenv("SIGNING_KEYS", '{"app_ledger_v1":"zowiesoft"}'))
 
@@ -1,25 +1,58 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.crypto_sm2 import make_sm2
 from app.core.exceptions import BizException
+from app.core.permissions import permission_registry
+from app.core.principal import Principal, load_principal
 from app.core.request_ctx import set_user_context
 from app.core.security import decode_token
-from app.core.session_store import get_active_sid, get_session_kv
-from app.db.db_session import get_db
-from app.db.models import (
-    Resource,
-    ResourceType,
-    RoleAreaGrant,
-    User,
-    UserRoleScope,
-)
+from app.core.session_store import get_auth_session
+from app.db.db_session import get_async_db, get_db
+from app.db.models import User
+from app.db.redis_session import get_redis_client
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# 每个请求只需解析一次的鉴权信息都挂在 AuthContext 上，各依赖从这里读取；
+# 同一请求内 FastAPI 的依赖缓存保证 get_auth_context 只执行一次
+AUTH_SESSION_FIELDS = ("cli_pubkey", "svr_privkey")
+
+
+@dataclass
+class AuthContext:
+    payload: Dict[str, Any]
+    principal: Principal
+    session: Dict[str, Optional[str]]
+    _sm2: Any = field(default=None, repr=False)
+    _user: Optional[User] = field(default=None, repr=False)
+
+    def sm2_client(self):
+        """会话期间加密/解密用的 SM2 客户端，首次使用时创建"""
+        if self._sm2 is None:
+            cli_pubkey = self.session.get("cli_pubkey")
+            svr_privkey = self.session.get("svr_privkey")
+            if not cli_pubkey or not svr_privkey:
+                raise BizException(message="获取SM2密钥对失败")
+            self._sm2 = make_sm2(svr_privkey, cli_pubkey, strict=False)
+        return self._sm2
+
+    async def load_user(self, db: AsyncSession) -> Optional[User]:
+        """需要完整用户行（如证件号、手机号）时使用，同一请求内只查一次"""
+        if self._user is None:
+            self._user = await db.scalar(select(User).where(User.userid == self.principal.userid))
+        return self._user
+
+
+async def get_auth_context(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> AuthContext:
     payload = decode_token(token)
     sub = payload.get("sub")
     sid = payload.get("sid")
@@ -28,59 +61,39 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     if sub is None or sid is None:
         raise BizException(code=401, message="无效的token")
 
-    current_sid = await get_active_sid(sub)
+    # active_sid 与 SM2 密钥一次 MGET 取回
+    current_sid, session = await get_auth_session(sub, sid, AUTH_SESSION_FIELDS)
     if current_sid is None or current_sid != sid:
         raise BizException(code=401, message="该账号已在其他设备登录")
 
-    user = db.query(User).filter(User.userid == sub).first()
-    if not user:
+    # 命中快照缓存时不访问数据库；AsyncSession 在首次执行语句前不会占用连接
+    snapshot = await load_principal(get_redis_client(), db, sub, sid)
+    if not snapshot:
         raise BizException(code=500, message="用户不存在")
-    
-    setattr(user, "sid", sid)
-    setattr(user, "role_id", role_id)
-    
-    return user
 
+    set_user_context(sub, sid, role_id)
+    return AuthContext(payload=payload, principal=Principal.from_snapshot(snapshot, sid, role_id), session=session)
 
-# 创建SM2客户端，用于会话期间加密/解密
-async def get_sm2_client(current_user: User = Depends(get_current_user)):
-    # 优先使用 current_user 上可能已经设置的 sid
-    sid = getattr(current_user, "sid", None)
-    if not sid:
-        # 如果没有，再从活动会话中获取
-        sid = await get_active_sid(current_user.userid)
-        if not sid:
-            raise BizException(code=401, message="未登录或登录过期")
-    
-    cli_pubkey = await get_session_kv(sid, "cli_pubkey")
-    svr_privkey = await get_session_kv(sid, "svr_privkey")
 
-    if not cli_pubkey or not svr_privkey:
-        raise BizException(message="获取SM2密钥对失败")
-    return make_sm2(svr_privkey, cli_pubkey, strict=False)
+async def get_current_user(ctx: AuthContext = Depends(get_auth_context)) -> Principal:
+    return ctx.principal
+
+
+# 创建SM2客户端，用于会话期间加密/解密
+async def get_sm2_client(ctx: AuthContext = Depends(get_auth_context)):
+    return ctx.sm2_client()
 
 
-# 鉴权
+# 鉴权：查进程内权限索引，不访问数据库（索引过期时才批量重建）
 def require_code(code: str):
     async def _checker(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
     ):
-        allowed = db.query(Resource).join(
-            RoleAreaGrant,
-            and_(
-                Resource.rid == RoleAreaGrant.rid,
-                RoleAreaGrant.role_id == current_user.role_id,
-                RoleAreaGrant.is_grant == 1,
-            ),
-        ).filter(
-            Resource.rcode == code,
-            Resource.status == 1,
-        ).first()
-        
-        if not allowed:
+        index = await permission_registry.get(get_redis_client(), db)
+        if not index.allows(current_user.role_id, code):
             raise BizException(code=403, message="没有权限")
 
-        return allowed
+        return index.resource_by_code(code)
     
     return _checker
\ No newline at end of file
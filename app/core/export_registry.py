@@ -0,0 +1,166 @@
+# app/core/export_registry.py
+"""
+导出任务去重登记
+
+以 (user_id, 格式, since, 数据水位) 作为 key 记录对应的 Celery 任务 id：
+- 数据没有变化时直接复用已生成的文件，不再重复导出
+- 同一个 key 的并发请求合并到同一个任务上（SET NX）
+水位取自汇总表的 change_seq + updated_at + 总笔数，新增/修改/删除都会刷新，读取只需按主键取一行
+"""
+import asyncio
+from datetime import datetime
+import os
+from typing import Optional
+from uuid import uuid4
+
+from celery import chord
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.exceptions import BizException
+from app.db.models import UserTransactionSummary
+from app.domains.enums import ExportFormat
+from app.tasks.celery_tasks import (
+    export_transactions_by_user_task,
+    export_transactions_shard_task,
+    merge_export_shards_task,
+)
+from app.tasks.export_reporter import export_job_key, plan_user_shards
+
+# 任务执行期间的占位时长，与 Celery 的 task_time_limit 一致，worker 异常退出后最多阻塞这么久
+EXPORT_INFLIGHT_TTL = 3600
+# 登记被并发请求抢占、随后又读不到对方的登记时，最多重试的轮数
+EXPORT_DISPATCH_ATTEMPTS = 3
+
+
+def export_watermark(summary: Optional[UserTransactionSummary]) -> str:
+    """汇总行 -> 水位标记（也用作导出文件名的一部分）"""
+    if summary is None:
+        return "0"
+    return f"{summary.change_seq}-{int(summary.updated_at.timestamp() * 1_000_000)}-{summary.total_transactions}"
+
+
+def _key(user_id: str, fmt: ExportFormat, since: Optional[datetime], watermark: str) -> str:
+    since_part = int(since.timestamp() * 1_000_000) if since else "full"
+    return f"export:{user_id}:{fmt.value}:{since_part}:{watermark}"
+
+
+def _artifact_ready(result) -> bool:
+    return isinstance(result, dict) and bool(result.get("path")) and os.path.exists(result["path"])
+
+
+async def dispatch_export(
+    redis,
+    user_id: str,
+    fmt: ExportFormat,
+    watermark: str,
+    since: Optional[datetime] = None,
+) -> dict:
+    """
+    返回 {task_id, task_status, task_result}
+    - 已有成功结果且文件仍在：直接返回结果
+    - 已有进行中的任务：返回同一个 task_id
+    - 否则登记并启动新任务
+    """
+    key = _key(user_id, fmt, since, watermark)
+
+    for _ in range(EXPORT_DISPATCH_ATTEMPTS):
+        task_id = await redis.get(key)
+        if task_id:
+            result = export_transactions_by_user_task.AsyncResult(task_id)
+            # 读取结果后端是同步网络调用，放到线程里执行
+            state, payload = await asyncio.to_thread(lambda: (result.state, result.info))
+            if state == "SUCCESS" and _artifact_ready(payload):
+                # 产物已就绪，占位延长到产物的保留时长
+                await redis.expire(key, settings.EXPORT_ARTIFACT_TTL)
+                return {"task_id": task_id, "task_status": state, "task_result": payload}
+            if state not in ("SUCCESS", "FAILURE"):
+                return {"task_id": task_id, "task_status": state, "task_result": payload}
+            # 失败或文件已被清理：重新导出
+            await redis.delete(key)
+
+        new_id = uuid4().hex
+        if await redis.set(key, new_id, nx=True, ex=EXPORT_INFLIGHT_TTL):
+            break
+        # 并发请求已抢先登记，合并到它的任务上；读取前该登记恰好过期或被删时重新走一遍
+        task_id = await redis.get(key)
+        if task_id:
+            return {"task_id": task_id, "task_status": "PENDING", "task_result": None}
+    else:
+        raise BizException(code=503, message="导出任务登记冲突，请稍后重试")
+
+    try:
+        # 投递到 broker 是同步网络调用，放到线程里执行，broker 慢或不可用时不阻塞事件循环
+        await asyncio.to_thread(
+            export_transactions_by_user_task.apply_async,
+            args=(user_id, fmt.value),
+            kwargs={"since": since.isoformat() if since else None, "tag": watermark},
+            task_id=new_id,
+        )
+    except Exception:
+        await redis.delete(key)
+        raise
+    return {"task_id": new_id, "task_status": "PENDING", "task_result": None}
+
+
+# ====== 管理端分片导出 ======
+
+async def dispatch_sharded_export(redis, db, fmt: ExportFormat, shard_count: Optional[int] = None) -> dict:
+    """
+    按用户把全量数据切成若干分片，group 并行导出，chord 回调合并
+    进度记录在 export_job:{job_id} hash 中，由 sharded_export_status 读取
+    """
+    rows = (await db.execute(
+        select(UserTransactionSummary.userid, UserTransactionSummary.total_transactions)
+    )).all()
+    shards = plan_user_shards(rows, shard_count or settings.EXPORT_SHARD_COUNT)
+    if not shards:
+        raise BizException(message="暂无交易记录")
+
+    job_id = uuid4().hex
+    job_key = export_job_key(job_id)
+    await redis.hset(job_key, mapping={
+        "total": sum(total for _, total in rows),
+        "rows": 0,
+        "shards": len(shards),
+        "shards_done": 0,
+        "fmt": fmt.value,
+    })
+    await redis.expire(job_key, settings.EXPORT_ARTIFACT_TTL)
+
+    header = [
+        export_transactions_shard_task.s(job_id, i, user_ids, fmt.value)
+        for i, user_ids in enumerate(shards)
+    ]
+    try:
+        result = await asyncio.to_thread(chord(header), merge_export_shards_task.s(job_id, fmt.value))
+    except Exception:
+        await redis.delete(job_key)
+        raise
+    await redis.hset(job_key, "task_id", result.id)
+    return {"job_id": job_id, "task_id": result.id, "shards": len(shards)}
+
+
+async def sharded_export_status(redis, job_id: str) -> dict:
+    job = await redis.hgetall(export_job_key(job_id))
+    if not job:
+        raise BizException(message="导出任务不存在或已过期")
+
+    total, done = int(job.get("total") or 0), int(job.get("rows") or 0)
+    data = {
+        "job_id": job_id,
+        "task_id": job.get("task_id"),
+        "rows": done,
+        "total": total,
+        "progress": min(100, done * 100 // total) if total else 0,
+        "shards": int(job.get("shards") or 0),
+        "shards_done": int(job.get("shards_done") or 0),
+        "task_status": "PENDING",
+        "task_result": None,
+    }
+    if data["task_id"]:
+        result = merge_export_shards_task.AsyncResult(data["task_id"])
+        state, payload = await asyncio.to_thread(lambda: (result.state, result.info))
+        data["task_status"] = state
+        data["task_result"] = payload if state == "SUCCESS" else None
+    return data
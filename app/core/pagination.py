@@ -0,0 +1,26 @@
+# app/core/pagination.py
+import base64
+from datetime import datetime
+import json
+from typing import Tuple
+
+from app.core.exceptions import BizException
+
+
+def encode_keyset(created_at: datetime, key: str) -> str:
+    """
+    把 (created_at, 主键) 编码为不透明游标
+    - 使用 urlsafe base64，去掉尾部 '='，方便直接放在 query 参数中
+    """
+    raw = json.dumps([created_at.isoformat(), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_keyset(token: str) -> Tuple[datetime, str]:
+    """解析 encode_keyset 生成的游标，格式不合法时抛出 400"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(key)
+    except Exception:
+        raise BizException(code=400, message="无效的分页游标")
@@ -0,0 +1,222 @@
+# app/core/permissions.py
+"""
+进程内权限索引
+
+授权数据（resources + role_area_grants）变化很少，每个 worker 一次性批量加载，编译成：
+- role_id -> 已授权 rcode 集合（require_code 判定为 O(1) 集合查找）
+- role_id -> 菜单 rcode -> 已授权按钮列表（getButtonRight 直接读取）
+- 启用菜单按父节点分组、预先排好序，菜单树按角色渲染一次后随索引缓存
+
+版本号保存在 Redis（perm:version）。修改资源或授权后调用 bump_permission_version，
+各 worker 最多每 PERMISSION_CHECK_INTERVAL 秒检查一次版本号，变化时整体重建索引。
+"""
+import asyncio
+from dataclasses import dataclass, field
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import Resource, RoleAreaGrant
+from app.domains.enums import ResourceType
+
+perm_logger = logger.bind(module="permissions")
+
+PERMISSION_VERSION_KEY = "perm:version"
+
+
+@dataclass(frozen=True)
+class ResourceEntry:
+    rid: str
+    rname: str
+    rcode: str
+    rtype: ResourceType
+    parent_id: Optional[str]
+    sort: int
+    status: int
+    path: Optional[str] = None
+    icon: Optional[str] = None
+    menu_type: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PermissionIndex:
+    version: str
+    resources: Dict[str, ResourceEntry]                          # rid -> 资源（含停用的）
+    rid_by_code: Dict[str, str]                                  # rcode -> rid
+    granted_rids: Dict[str, FrozenSet[str]]                      # role_id -> 已授权且启用的 rid
+    granted_codes: Dict[str, FrozenSet[str]]                     # role_id -> 已授权且启用的 rcode
+    buttons: Dict[str, Dict[str, Tuple[ResourceEntry, ...]]]     # role_id -> 菜单 rcode -> 按钮
+    menu_children: Dict[Optional[str], Tuple[ResourceEntry, ...]]  # 父 rid -> 启用的子菜单（已排序）
+    # 按 key 缓存的渲染结果，随索引一起替换，无需单独失效
+    _rendered: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    def allows(self, role_id: Optional[str], code: str) -> bool:
+        return code in self.granted_codes.get(role_id, frozenset())
+
+    def resource_by_code(self, code: str) -> Optional[ResourceEntry]:
+        rid = self.rid_by_code.get(code)
+        return self.resources.get(rid) if rid else None
+
+    def granted_buttons(self, role_id: Optional[str], menu_code: str) -> Tuple[ResourceEntry, ...]:
+        return self.buttons.get(role_id, {}).get(menu_code, ())
+
+    def menu_tree(self, role_id: Optional[str]) -> List[Dict[str, Any]]:
+        """角色可见的菜单树：节点及其所有祖先都已授权才会出现"""
+        granted = self.granted_rids.get(role_id, frozenset())
+
+        def build(parent_id: Optional[str]) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "id": res.rid,
+                    "name": res.rname,
+                    "code": res.rcode,
+                    "path": res.path,
+                    "icon": res.icon,
+                    "menuType": res.menu_type,
+                    "children": build(res.rid),
+                }
+                for res in self.menu_children.get(parent_id, ())
+                if res.rid in granted
+            ]
+
+        return build(None)
+
+    def cached_render(self, key: str, render: Callable[[], Any]) -> Any:
+        if key not in self._rendered:
+            self._rendered[key] = render()
+        return self._rendered[key]
+
+
+def _sort_key(entry: ResourceEntry):
+    return (entry.sort or 0, entry.rcode)
+
+
+def build_permission_index(
+    version: str,
+    resources: Iterable[ResourceEntry],
+    grants: Iterable[Tuple[str, str]],
+) -> PermissionIndex:
+    """由全部资源与 (role_id, rid) 授权对编译索引；只有启用的资源参与授权"""
+    by_rid = {r.rid: r for r in resources}
+    rid_by_code = {r.rcode: r.rid for r in by_rid.values()}
+
+    rids: Dict[str, set] = {}
+    for role_id, rid in grants:
+        res = by_rid.get(rid)
+        if res is not None and res.status == 1:
+            rids.setdefault(role_id, set()).add(rid)
+
+    granted_codes: Dict[str, FrozenSet[str]] = {}
+    buttons: Dict[str, Dict[str, Tuple[ResourceEntry, ...]]] = {}
+    for role_id, role_rids in rids.items():
+        granted_codes[role_id] = frozenset(by_rid[rid].rcode for rid in role_rids)
+        per_menu: Dict[str, list] = {}
+        for rid in role_rids:
+            res = by_rid[rid]
+            parent = by_rid.get(res.parent_id) if res.parent_id else None
+            if res.rtype == ResourceType.BUTTON and parent is not None:
+                per_menu.setdefault(parent.rcode, []).append(res)
+        buttons[role_id] = {code: tuple(sorted(items, key=_sort_key)) for code, items in per_menu.items()}
+
+    menu_children: Dict[Optional[str], list] = {}
+    for res in by_rid.values():
+        if res.rtype == ResourceType.MENU and res.status == 1:
+            menu_children.setdefault(res.parent_id, []).append(res)
+
+    return PermissionIndex(
+        version=version,
+        resources=by_rid,
+        rid_by_code=rid_by_code,
+        granted_rids={role_id: frozenset(v) for role_id, v in rids.items()},
+        granted_codes=granted_codes,
+        buttons=buttons,
+        menu_children={pid: tuple(sorted(items, key=_sort_key)) for pid, items in menu_children.items()},
+    )
+
+
+async def load_permission_index(db: AsyncSession, version: str) -> PermissionIndex:
+    """两条查询批量加载，只取需要的列，不触发 Resource.parent 的关系加载"""
+    resource_rows = (await db.execute(select(
+        Resource.rid,
+        Resource.rname,
+        Resource.rcode,
+        Resource.rtype,
+        Resource.parent_id,
+        Resource.sort,
+        Resource.status,
+        Resource.path,
+        Resource.icon,
+        Resource.menu_type,
+    ))).all()
+    grant_rows = (await db.execute(
+        select(RoleAreaGrant.role_id, RoleAreaGrant.rid).where(RoleAreaGrant.is_grant == 1)
+    )).all()
+
+    resources = [
+        ResourceEntry(
+            rid=row.rid,
+            rname=row.rname,
+            rcode=row.rcode,
+            rtype=row.rtype,
+            parent_id=row.parent_id,
+            sort=row.sort or 0,
+            status=row.status,
+            path=row.path,
+            icon=row.icon,
+            menu_type=row.menu_type.value if row.menu_type is not None else None,
+        )
+        for row in resource_rows
+    ]
+    return build_permission_index(version, resources, ((g.role_id, g.rid) for g in grant_rows))
+
+
+class PermissionRegistry:
+    """每个 worker 一份索引；读取时按间隔检查 Redis 版本号，变化则重建"""
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._index: Optional[PermissionIndex] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._index is not None and time.monotonic() - self._checked_at < self.check_interval
+
+    async def get(self, redis, db: AsyncSession) -> PermissionIndex:
+        if self._fresh():
+            return self._index
+
+        async with self._lock:
+            if self._fresh():
+                return self._index
+            try:
+                version = await redis.get(PERMISSION_VERSION_KEY) or "0"
+            except Exception as e:
+                # Redis 不可用时沿用已有索引，首次加载则按 "0" 处理
+                perm_logger.warning(f"permission version check failed: {e}")
+                if self._index is not None:
+                    return self._index
+                version = "0"
+
+            # 先读版本号再加载数据：加载期间发生的修改会在下一次检查时再次触发重建
+            if self._index is None or self._index.version != version:
+                self._index = await load_permission_index(db, version)
+                perm_logger.info(f"permission index loaded, version={version}")
+            self._checked_at = time.monotonic()
+            return self._index
+
+    def reset(self) -> None:
+        self._index = None
+        self._checked_at = 0.0
+
+
+permission_registry = PermissionRegistry(settings.PERMISSION_CHECK_INTERVAL)
+
+
+async def bump_permission_version(redis) -> None:
+    """修改资源或授权并提交后调用"""
+    await redis.incr(PERMISSION_VERSION_KEY)
@@ -0,0 +1,94 @@
+# app/core/principal.py
+"""
+登录用户快照（Principal）
+
+get_current_user 每个请求都会执行，原先要查一次 users 再由 selectin 查一次角色。
+这里把用户基本信息与有效角色压缩成 JSON，按 (uid, sid) 缓存在 Redis + 进程内 L1，
+命中时整个鉴权过程不访问数据库。
+
+失效时机：
+- 退出登录 / 切换角色：使当前 sid 的快照失效
+- 用户信息、角色、状态变化：调用 invalidate_user_principals 使该用户全部会话的快照失效
+  目前修改用户行的接口只有 setDefaultRole（注册时还没有会话，无需失效）；新增资料/状态/角色分配接口时
+  须在提交后调用。直接改库时执行 scripts/invalidate_user_principals.py
+"""
+from dataclasses import dataclass
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import principal_cache
+from app.core.session_store import list_user_sids
+from app.db.models import User
+
+
+@dataclass(frozen=True)
+class RoleRef:
+    role_id: str
+    role_name: str
+    role_code: str
+
+
+@dataclass
+class Principal:
+    """
+    替代 ORM User 作为 current_user，字段与原先路由中用到的属性保持一致
+    sid / role_id 来自当前 token，不进缓存
+    """
+    userid: str
+    username: str
+    status: str
+    default_role_id: Optional[str]
+    roles: Tuple[RoleRef, ...]
+    sid: Optional[str] = None
+    role_id: Optional[str] = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any], sid: Optional[str], role_id: Optional[str]) -> "Principal":
+        return cls(
+            userid=snapshot["userid"],
+            username=snapshot["username"],
+            status=snapshot["status"],
+            default_role_id=snapshot.get("default_role_id"),
+            roles=tuple(RoleRef(**r) for r in snapshot.get("roles", [])),
+            sid=sid,
+            role_id=role_id,
+        )
+
+
+def principal_key(uid: str, sid: str) -> str:
+    return f"{uid}:{sid}"
+
+
+def principal_snapshot(user: User) -> str:
+    return json.dumps({
+        "userid": user.userid,
+        "username": user.username,
+        "status": user.status.value if hasattr(user.status, "value") else user.status,
+        "default_role_id": user.default_role_id,
+        "roles": [
+            {"role_id": r.role_id, "role_name": r.role_name, "role_code": r.role_code}
+            for r in user.roles
+        ],
+    }, ensure_ascii=False, separators=(",", ":"))
+
+
+async def load_principal(redis, db: AsyncSession, uid: str, sid: str) -> Optional[Dict[str, Any]]:
+    """读取快照，未命中时查库；用户不存在返回 None"""
+    async def _load() -> Optional[str]:
+        user = await db.scalar(select(User).where(User.userid == uid))
+        return principal_snapshot(user) if user else None
+
+    return await principal_cache.get_or_load(redis, principal_key(uid, sid), _load)
+
+
+async def invalidate_principal(redis, uid: str, sid: str) -> None:
+    await principal_cache.bump(redis, principal_key(uid, sid))
+
+
+async def invalidate_user_principals(redis, uid: str) -> None:
+    """用户资料/角色/状态变更后调用，使该用户所有会话的快照失效"""
+    for sid in await list_user_sids(uid):
+        await invalidate_principal(redis, uid, sid)
@@ -1,6 +1,6 @@
 # app/core/session_store.py  （Drop-in 替换）
 import asyncio
-from typing import Optional
+from typing import Dict, Optional, Sequence, Tuple
 from uuid import uuid4
 
 from app.core.config import settings
@@ -33,6 +33,12 @@ async def clear_active_sid(uid: str|int):
     r = get_redis_client()
     await r.delete(_active_sid_key(uid))
 
+async def get_auth_session(uid: str | int, sid: str, fields: Sequence[str]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """一次 MGET 同时取回 active_sid 指针和本会话的若干字段"""
+    r = get_redis_client()
+    values = await r.mget(_active_sid_key(uid), *(_sessk(sid, f) for f in fields))
+    return values[0], dict(zip(fields, values[1:]))
+
 # --- 按 sid 的 KV ---
 async def set_session_kv(sid: str, field: str, value: str, ttl: int = SESSION_TTL_SECONDS):
     r = get_redis_client()
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
 
@@ -27,6 +28,36 @@ def get_db():
     finally:
         db.close()
 
+
+def _async_database_url(url: str) -> str:
+    # psycopg3 同一个驱动名即可用于 create_async_engine；SQLite 需换成 aiosqlite
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+# 异步引擎：async 路由使用，避免同步查询阻塞事件循环
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    pool_pre_ping = True,
+    pool_size = 5,
+    max_overflow = 20,
+    pool_recycle = 1800,
+    pool_use_lifo=True,
+    connect_args={
+        "connect_timeout": 10
+    }
+)
+AsyncSessionLocal = async_sessionmaker[AsyncSession](
+    bind=async_engine,
+    autoflush=False,
+    # 提交后不过期对象，避免在 async 中访问属性时触发隐式 IO
+    expire_on_commit=False,
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
     # 创建所有表
     ModelBase.metadata.create_all(bind=engine)
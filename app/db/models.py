@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from uuid import uuid4
 
-from sqlalchemy import DateTime, Enum as SqlEnum, Integer, String, UniqueConstraint, func, ForeignKey, Float, CheckConstraint, Text, Boolean
+from sqlalchemy import BigInteger, Date, DateTime, Enum as SqlEnum, Integer, Numeric, String, UniqueConstraint, func, ForeignKey, Float, CheckConstraint, Text, Boolean, Index, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from app.domains.enums import FileStatus, TransactionType, UserStatus, MenuType, ResourceType
@@ -20,6 +21,19 @@ class TimestampMixin:
         DateTime(timezone=True), onupdate=func.now(), nullable=True
     )
 
+def _partition_key_column():
+    """
+    按 created_at 分区的表：PostgreSQL 要求主键包含分区键，created_at 并入主键
+    应用侧生成默认值，插入时即可确定落在哪个分区
+    """
+    return mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+        nullable=False,
+        primary_key=True,
+    )
+
 class User(ModelBase, TimestampMixin):
     __tablename__ = "users"
 
@@ -190,18 +204,33 @@ class AuditLog(ModelBase, TimestampMixin):
 
 class Transaction(ModelBase, TimestampMixin):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # 列表/游标分页专用：按用户过滤 + (created_at, transaction_id) 倒序
+        Index("ix_transactions_user_created_tx", "create_userid", text("created_at DESC"), text("transaction_id DESC")),
+        # 备注模糊搜索：pg_trgm GIN 索引，支持 ILIKE '%kw%'
+        Index("ix_transactions_remark_trgm", "remark", postgresql_using="gin", postgresql_ops={"remark": "gin_trgm_ops"}),
+        # 按 created_at 月度范围分区，分区由 app/db/partitions.py 维护
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    transaction_id: Mapped[str] = mapped_column(String(32), unique=True, index=True, default=lambda: uuid4().hex, primary_key=True)
+    # 分区表上的唯一约束必须包含分区键，transaction_id 的全局唯一由 transaction_keys 保证
+    transaction_id: Mapped[str] = mapped_column(String(32), index=True, default=lambda: uuid4().hex, primary_key=True)
+    created_at: Mapped[datetime] = _partition_key_column()
     create_userid: Mapped[str] = mapped_column(String(32), ForeignKey("users.userid"), index=True)
     update_userid: Mapped[str] = mapped_column(String(32), ForeignKey("users.userid"), nullable=True)
-    amount: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0, nullable=False)
     type: Mapped[TransactionType] = mapped_column(SqlEnum(TransactionType))
     remark: Mapped[str] = mapped_column(String(255), nullable=True)
 
 class Fileassets(ModelBase, TimestampMixin):
     __tablename__ = "fileassets"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    fileid: Mapped[str] = mapped_column(String(32), unique=True, index=True, default=lambda: uuid4().hex, primary_key=True)
+    # fileid 的全局唯一由 fileasset_keys 保证
+    fileid: Mapped[str] = mapped_column(String(32), index=True, default=lambda: uuid4().hex, primary_key=True)
+    created_at: Mapped[datetime] = _partition_key_column()
     filepath: Mapped[str] = mapped_column(String(255), nullable=False)
     type: Mapped[str] = mapped_column(String(20), nullable=False)
     category: Mapped[str] = mapped_column(String(20), nullable=True)
@@ -210,6 +239,43 @@ class Fileassets(ModelBase, TimestampMixin):
     status: Mapped[FileStatus] = mapped_column(SqlEnum(FileStatus), default=FileStatus.ACTIVE, nullable=False)
     update_userid: Mapped[str] = mapped_column(String(32), nullable=True)
 
+# 业务 id 键表：不分区，保证 transaction_id / fileid 全局唯一，并记录各 id 所在分区的 created_at
+# 由分区表上的触发器维护（见 app/db/partitions.py），应用代码只读
+class TransactionKey(ModelBase):
+    __tablename__ = "transaction_keys"
+
+    transaction_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+class FileassetKey(ModelBase):
+    __tablename__ = "fileasset_keys"
+
+    fileid: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+# 用户交易汇总表：由写路径增量维护，替代每次查询都重新聚合的视图
+class UserTransactionSummary(ModelBase):
+    __tablename__ = "user_transaction_totals"
+
+    userid: Mapped[str] = mapped_column(String(32), ForeignKey("users.userid"), primary_key=True)
+    total_transactions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_income: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0, nullable=False)
+    total_expense: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    # 每次累加/扣减都 +1，作为导出去重的水位；updated_at 取事务开始时间，晚提交的写入可能让它回退或不变
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+
+class UserTransactionDaily(ModelBase):
+    """按 (用户, 自然日, 类型) 累计的日汇总，统计接口在此基础上按周/月聚合"""
+    __tablename__ = "user_transaction_daily"
+
+    userid: Mapped[str] = mapped_column(String(32), ForeignKey("users.userid"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    type: Mapped[TransactionType] = mapped_column(SqlEnum(TransactionType), primary_key=True)
+    total_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
 # 定义用户交易摘要视图
 class UserTransactionSummaryView(ViewBase):
     __tablename__ = "user_transaction_summary"
@@ -218,12 +284,32 @@ class UserTransactionSummaryView(ViewBase):
     userid: Mapped[str] = mapped_column(String(32), primary_key=True, index=True)
     username: Mapped[str] = mapped_column(String(50), index=True)
     total_transactions: Mapped[int] = mapped_column(Integer, default=0)
-    total_income: Mapped[float] = mapped_column(Float, default=0)
-    total_expense: Mapped[float] = mapped_column(Float, default=0)
+    total_income: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0)
+    total_expense: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0)
 
 
 # 添加事件监听器来验证button资源的父级必须是menu类型
-from sqlalchemy import event, select
+from sqlalchemy import DDL, event, select
+
+from app.db.partitions import id_key_trigger_ddl
+
+# create_all 建 trgm 索引前先确保扩展存在（alembic 迁移中同样会创建）
+event.listen(
+    ModelBase.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# create_all 建出的分区父表至少要有默认分区才能写入，月分区由定时任务补建
+for _table in (Transaction.__table__, Fileassets.__table__):
+    event.listen(
+        _table,
+        "after_create",
+        DDL(f"CREATE TABLE IF NOT EXISTS {_table.name}_default PARTITION OF {_table.name} DEFAULT").execute_if(dialect="postgresql"),
+    )
+    # 键表同步触发器；函数体在执行时才解析，不依赖键表的创建顺序
+    for _stmt in id_key_trigger_ddl(_table.name):
+        event.listen(_table, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
 
 @event.listens_for(Resource, 'before_insert')
 @event.listens_for(Resource, 'before_update')
@@ -0,0 +1,231 @@
+# app/db/partitions.py
+"""
+transactions / fileassets 按 created_at 月度范围分区的维护（仅 PostgreSQL）
+
+- 分区命名：{表名}_pYYYYMM，覆盖 UTC [当月 1 日, 次月 1 日)
+- 每张表另有一个 {表名}_default 兜底分区，接住尚未建好月分区的数据
+- 新建月分区时先把默认分区里属于该月的数据搬过去再 ATTACH，
+  因此即使默认分区已有数据也能安全补建
+- 过期分区 DETACH 后移到归档 schema，不再参与查询，需要时可重新 ATTACH 回来；
+  交易分区归档前先从汇总表与日汇总中扣除，重新 ATTACH 后需执行 scripts/rebuild_transaction_summary.py
+- 分区表上的唯一约束必须包含分区键，业务 id 的全局唯一性由不分区的键表保证：
+  触发器在插入/删除时同步 {id, created_at}，键表 id 为主键，重复 id 会让插入失败；
+  同时按 id 查询时可先从键表取 created_at，使查询只扫描一个分区
+
+函数都接收同步 Connection，alembic 迁移与 Celery 定时任务共用
+"""
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARTITIONED_TABLES = ("transactions", "fileassets")
+
+# 分区表 -> (键表, 业务 id 列)
+ID_KEY_TABLES = {
+    "transactions": ("transaction_keys", "transaction_id"),
+    "fileassets": ("fileasset_keys", "fileid"),
+}
+
+
+def id_key_trigger_ddl(table: str) -> List[str]:
+    """建立键表同步触发器的语句（分区父表上的行级触发器会自动作用到所有分区）"""
+    key_table, id_col = ID_KEY_TABLES[table]
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {table}_sync_keys() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {key_table} ({id_col}, created_at) VALUES (NEW.{id_col}, NEW.created_at);
+                RETURN NEW;
+            END IF;
+            DELETE FROM {key_table} WHERE {id_col} = OLD.{id_col};
+            RETURN OLD;
+        END
+        $$
+        """,
+        f"DROP TRIGGER IF EXISTS {table}_sync_keys ON {table}",
+        f"CREATE TRIGGER {table}_sync_keys AFTER INSERT OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_sync_keys()",
+    ]
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def list_partitions(conn: Connection, table: str) -> List[str]:
+    """当前挂在父表下的分区名"""
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {"table": table}).scalars().all()
+    return list(rows)
+
+
+def create_default_partition(conn: Connection, table: str) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+    ))
+
+
+def create_month_partition(conn: Connection, table: str, start: date) -> bool:
+    """
+    建立 start 所在月的分区，已存在时返回 False
+    建成普通表 -> 从默认分区搬入该月数据 -> ATTACH，整个过程在调用方的事务内
+    """
+    start = month_start(start)
+    name = partition_name(table, start)
+    if name in list_partitions(conn, table):
+        return False
+
+    end = add_months(start, 1)
+    # created_at 是 timestamptz：边界与搬迁条件都显式写成 UTC，不受连接的 TimeZone 影响
+    start_ts = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+    end_ts = datetime(end.year, end.month, 1, tzinfo=timezone.utc)
+    bounds = {"start": start_ts, "end": end_ts}
+    default = default_partition_name(table)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if default in list_partitions(conn, table):
+        conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {default}
+                WHERE created_at >= :start AND created_at < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), bounds)
+        # 从默认分区删除时触发器已删掉这些行的键，新表尚未挂载不会触发插入，这里补回
+        if table in ID_KEY_TABLES:
+            key_table, id_col = ID_KEY_TABLES[table]
+            conn.execute(text(f"""
+                INSERT INTO {key_table} ({id_col}, created_at)
+                SELECT {id_col}, created_at FROM {name}
+                ON CONFLICT DO NOTHING
+            """))
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"
+    ))
+    return True
+
+
+def ensure_partitions(
+    conn: Connection,
+    months_ahead: int,
+    since: Optional[date] = None,
+    tables: Iterable[str] = PARTITIONED_TABLES,
+) -> List[str]:
+    """确保从 since（默认当月）到未来 months_ahead 个月的分区都存在，返回新建的分区名"""
+    first = month_start(since or datetime.now(timezone.utc).date())
+    last = add_months(month_start(datetime.now(timezone.utc).date()), months_ahead)
+    created = []
+    for table in tables:
+        create_default_partition(conn, table)
+        current = first
+        while current <= last:
+            if create_month_partition(conn, table, current):
+                created.append(partition_name(table, current))
+            current = add_months(current, 1)
+    return created
+
+
+def subtract_partition_from_rollups(conn: Connection, name: str, stats_timezone: str) -> List[str]:
+    """
+    从汇总表与日汇总中扣除某个交易分区的全部数据，返回受影响的用户
+    归档前在同一事务内执行，汇总始终与仍可查询的明细一致；updated_at 随之刷新，导出水位同步变化
+    """
+    users = conn.execute(text(f"""
+        WITH agg AS (
+            SELECT
+                create_userid AS userid,
+                COUNT(*) AS cnt,
+                COALESCE(SUM(CASE WHEN type = 'INCOME' THEN amount ELSE 0 END), 0) AS income,
+                COALESCE(SUM(CASE WHEN type = 'EXPENSE' THEN amount ELSE 0 END), 0) AS expense
+            FROM {name}
+            GROUP BY create_userid
+        )
+        UPDATE user_transaction_totals s SET
+            total_transactions = s.total_transactions - agg.cnt,
+            total_income = s.total_income - agg.income,
+            total_expense = s.total_expense - agg.expense,
+            updated_at = now(),
+            change_seq = s.change_seq + 1
+        FROM agg
+        WHERE s.userid = agg.userid
+        RETURNING s.userid
+    """)).scalars().all()
+
+    # 日汇总按统计时区的自然日归属，与写路径、重建脚本一致
+    conn.execute(text(f"""
+        WITH agg AS (
+            SELECT
+                create_userid AS userid,
+                CAST(created_at AT TIME ZONE :tz AS date) AS day,
+                type,
+                COUNT(*) AS cnt,
+                SUM(amount) AS amount
+            FROM {name}
+            GROUP BY 1, 2, 3
+        )
+        UPDATE user_transaction_daily d SET
+            total_count = d.total_count - agg.cnt,
+            total_amount = d.total_amount - agg.amount,
+            updated_at = now()
+        FROM agg
+        WHERE d.userid = agg.userid AND d.day = agg.day AND d.type = agg.type
+    """), {"tz": stats_timezone})
+    conn.execute(text("DELETE FROM user_transaction_daily WHERE total_count <= 0"))
+    return list(users)
+
+
+def detach_expired_partitions(
+    conn: Connection,
+    retention_months: int,
+    archive_schema: str,
+    stats_timezone: str,
+    tables: Iterable[str] = PARTITIONED_TABLES,
+) -> Dict[str, List[str]]:
+    """
+    把早于保留期的月分区 DETACH 并移动到归档 schema
+    交易分区在 DETACH 前先从汇总/日汇总中扣除，与 DETACH 处于同一事务
+    返回 {"detached": 分区名, "users": 汇总发生变化的用户}，调用方据此失效统计缓存
+    retention_months <= 0 表示不归档
+    """
+    result: Dict[str, List[str]] = {"detached": [], "users": []}
+    if retention_months <= 0:
+        return result
+
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -retention_months)
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    users = set()
+    for table in tables:
+        prefix = f"{table}_p"
+        for name in list_partitions(conn, table):
+            suffix = name[len(prefix):]
+            if not name.startswith(prefix) or not suffix.isdigit():
+                continue
+            if date(int(suffix[:4]), int(suffix[4:]), 1) >= cutoff:
+                continue
+            if table == "transactions":
+                users.update(subtract_partition_from_rollups(conn, name, stats_timezone))
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+            result["detached"].append(name)
+    result["users"] = sorted(users)
+    return result
@@ -1,10 +1,12 @@
 from typing import Optional
 
+import redis as redis_sync
 import redis.asyncio as redis
 
 from app.core.config import settings
 
 _redis: Optional[redis.Redis] = None
+_sync_redis: Optional[redis_sync.Redis] = None
 
 async def init_redis() -> redis.Redis:
     """在应用启动时调用，创建全局连接（或连接池）"""
@@ -31,4 +33,18 @@ def get_redis_client() -> redis.Redis:
     if _redis is None:
         # 开发/测试没跑 startup 时给出明确提示
         raise RuntimeError("Redis not initialized. Call init_redis() on startup.")
-    return _redis
\ No newline at end of file
+    return _redis
+
+
+def get_sync_redis_client() -> redis_sync.Redis:
+    """Celery worker 等同步环境使用的客户端，首次调用时创建"""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis_sync.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            retry_on_timeout=True,
+            health_check_interval=30,
+            encoding="utf-8",
+        )
+    return _sync_redis
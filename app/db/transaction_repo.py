@@ -0,0 +1,590 @@
+# app/db/transaction_repo.py
+"""
+交易记录相关的查询构造
+
+只负责构造 SQLAlchemy 语句（select/update/insert），不绑定具体 Session，
+同步路由与异步路由都可以直接 execute 这里返回的语句。
+"""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import json
+from typing import Any, Iterable, List, Optional
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, Select, and_, case, cast, delete, func, insert, literal_column, select, true, tuple_, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.config import settings
+from app.core.exceptions import BizException
+from app.db.models import Fileassets, Transaction, TransactionKey, User, UserTransactionDaily, UserTransactionSummary
+from app.domains.enums import FileStatus, StatsGranularity, TransactionType
+from app.schemas.transactions import FileInfo, TransactionCreate, TransactionFilter
+
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_keyword_filter(keyword: str, dialect_name: str):
+    """
+    关键字搜索条件
+    - type 是枚举，两种后端都在 Python 侧匹配成 IN 列表，避免对枚举列做 ILIKE
+      （无法走索引，PostgreSQL 上枚举也不支持 ILIKE）
+    - trgm：remark ILIKE 可命中 pg_trgm GIN 索引
+    - ilike：原有实现，SQLite 等不支持 pg_trgm 的数据库使用，关键字不转义
+    """
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        backend = "trgm" if dialect_name == "postgresql" else "ilike"
+
+    if backend == "trgm":
+        cond = Transaction.remark.ilike(f"%{_escape_like(keyword)}%", escape="\\")
+    else:
+        cond = Transaction.remark.ilike(f"%{keyword}%")
+
+    matched_types = [t for t in TransactionType if keyword.lower() in t.value.lower()]
+    if matched_types:
+        cond = cond | Transaction.type.in_(matched_types)
+    return cond
+
+
+def build_transaction_filters(form: TransactionFilter, userid: str, dialect_name: str = "postgresql") -> list:
+    """按列表查询条件生成 where 子句"""
+    conds = [Transaction.create_userid == userid]
+    if form.date_from:
+        conds.append(Transaction.created_at >= form.date_from)
+    if form.date_to:
+        conds.append(Transaction.created_at <= form.date_to)
+    if form.type:
+        conds.append(Transaction.type == form.type)
+    if form.min_amount is not None:
+        conds.append(Transaction.amount >= form.min_amount)
+    if form.max_amount is not None:
+        conds.append(Transaction.amount <= form.max_amount)
+    if form.keyword:
+        conds.append(build_keyword_filter(form.keyword, dialect_name))
+    return conds
+
+
+# 列表统一排序：created_at 倒序，transaction_id 作为平局裁决，保证顺序稳定
+# 与索引 ix_transactions_user_created_tx (create_userid, created_at DESC, transaction_id DESC) 一致
+TRANSACTION_ORDER_BY = (Transaction.created_at.desc(), Transaction.transaction_id.desc())
+
+
+def build_keyset_page(
+    conds: list,
+    page_size: int,
+    after: Optional[tuple[datetime, str]] = None,
+) -> Select:
+    """
+    游标分页语句：WHERE (created_at, transaction_id) < (:c, :id) ORDER BY ... LIMIT n+1
+    多取一条用于判断是否还有下一页
+    """
+    stmt = select(Transaction).where(*conds)
+    if after is not None:
+        # 行值比较无法用于分区裁剪，额外加一个单列的 created_at 上界
+        stmt = stmt.where(
+            Transaction.created_at <= after[0],
+            tuple_(Transaction.created_at, Transaction.transaction_id) < tuple_(*after),
+        )
+    return stmt.order_by(*TRANSACTION_ORDER_BY).limit(page_size + 1)
+
+
+def build_snapshot_filter(high_water: tuple[datetime, str]):
+    """快照条件：只看 (created_at, transaction_id) 不超过第一页高水位的记录，翻页期间新增的数据不会挤动分页"""
+    return and_(
+        Transaction.created_at <= high_water[0],
+        tuple_(Transaction.created_at, Transaction.transaction_id) <= tuple_(*high_water),
+    )
+
+
+def build_transaction_lookup(transaction_id: str, dialect_name: str) -> list:
+    """
+    按 transaction_id 定位交易的条件
+    PostgreSQL 上从键表取出 created_at 作为分区键条件，执行时只扫描一个分区；
+    其它数据库没有分区和键表，只按 id 查询
+    """
+    conds = [Transaction.transaction_id == transaction_id]
+    if dialect_name == "postgresql":
+        conds.append(Transaction.created_at == (
+            select(TransactionKey.created_at)
+            .where(TransactionKey.transaction_id == transaction_id)
+            .scalar_subquery()
+        ))
+    return conds
+
+
+def build_transaction_locked(transaction_id: str, dialect_name: str) -> Select:
+    """
+    加行锁读取交易，修改/删除时据此计算汇总增量，避免并发修改基于同一份旧值重复扣减
+    populate_existing：同一会话里之前读过该行（如审计取 before_data）时以加锁后读到的值为准
+    """
+    return (
+        select(Transaction)
+        .where(*build_transaction_lookup(transaction_id, dialect_name))
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def build_transaction_delete(transaction_id: str, dialect_name: str):
+    """删除交易并返回计算汇总增量所需的列；已被并发删除时不返回任何行"""
+    return (
+        delete(Transaction)
+        .where(*build_transaction_lookup(transaction_id, dialect_name))
+        .returning(Transaction.create_userid, Transaction.type, Transaction.amount, Transaction.created_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def split_keyset_rows(rows: List[Transaction], page_size: int) -> tuple[List[Transaction], bool]:
+    """拆分 build_keyset_page 的结果，返回 (当前页数据, 是否还有下一页)"""
+    return rows[:page_size], len(rows) > page_size
+
+
+def build_summary_cte(userid: str):
+    """用户汇总（总笔数/总收入/总支出），作为 CTE 挂到分页语句上"""
+    st = UserTransactionSummary
+    return select(
+        st.total_transactions,
+        st.total_income,
+        st.total_expense,
+    ).where(st.userid == userid).cte("summary")
+
+
+def build_windowed_page(
+    conds: list,
+    userid: str,
+    offset: int,
+    limit: int,
+    with_total: bool = True,
+) -> Select:
+    """
+    一次往返取回：当前页数据 + 总条数（COUNT(*) OVER()）+ 用户汇总
+    返回行结构：(Transaction, total?, total_transactions, total_income, total_expense)
+    """
+    summary = build_summary_cte(userid)
+    cols: list[Any] = [Transaction]
+    if with_total:
+        cols.append(func.count().over().label("total"))
+    cols += [summary.c.total_transactions, summary.c.total_income, summary.c.total_expense]
+    return (
+        select(*cols)
+        .select_from(Transaction)
+        .outerjoin(summary, true())
+        .where(*conds)
+        .order_by(*TRANSACTION_ORDER_BY)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def summary_extras_from_row(row) -> dict:
+    """从 build_windowed_page 的结果行中取出汇总字段"""
+    if row is None or row.total_transactions is None:
+        # 汇总表中还没有该用户（从未记账），与旧视图保持一致返回 0
+        return {"total_transactions": 0, "total_income": 0, "total_expense": 0}
+    # extras 是普通 dict，Decimal 会被序列化成字符串；与 Money 字段一致按数字返回
+    return {
+        "total_transactions": row.total_transactions,
+        "total_income": float(row.total_income),
+        "total_expense": float(row.total_expense),
+    }
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <stmt>，只走规划器，不真正执行查询"""
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _pg_explain(element: Explain, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def build_count_estimate(conds: list) -> Explain:
+    """估算过滤后结果集行数（仅 PostgreSQL）"""
+    return Explain(select(Transaction.transaction_id).where(*conds))
+
+
+def plan_rows(explain_output) -> Optional[int]:
+    """解析 EXPLAIN (FORMAT JSON) 的输出，取顶层节点的 Plan Rows"""
+    try:
+        if isinstance(explain_output, (str, bytes)):
+            explain_output = json.loads(explain_output)
+        return int(explain_output[0]["Plan"]["Plan Rows"])
+    except Exception:
+        return None
+
+
+# ====== 详情 ======
+
+def _file_json_pairs() -> tuple:
+    """附件 JSON 对象的键值参数，键名与 FileInfo 一致（键用字面量，避免参数类型无法推断）"""
+    fa = Fileassets
+    return (
+        literal_column("'filepath'"), fa.filepath,
+        literal_column("'fileid'"), fa.fileid,
+        literal_column("'photo_id'"), fa.category,
+    )
+
+
+def build_transaction_detail(transaction_id: str, dialect_name: str) -> Select:
+    """
+    一条语句取回交易详情：交易字段 + 创建人用户名 + 有效附件列表（聚合为 JSON 数组）
+    返回行结构：(交易表各列..., create_username, filelist)
+    """
+    fa = Fileassets
+    if dialect_name == "postgresql":
+        files_agg = func.json_agg(func.json_build_object(*_file_json_pairs()))
+    else:
+        files_agg = func.json_group_array(func.json_object(*_file_json_pairs()))
+
+    filelist = (
+        select(files_agg)
+        .where(fa.business_id == Transaction.transaction_id, fa.status == FileStatus.ACTIVE)
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+    create_username = (
+        select(User.username)
+        .where(User.userid == Transaction.create_userid)
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+    return select(
+        Transaction.__table__,
+        create_username.label("create_username"),
+        filelist.label("filelist"),
+    ).where(*build_transaction_lookup(transaction_id, dialect_name))
+
+
+def transaction_detail_from_row(row) -> dict:
+    """把 build_transaction_detail 的结果行转换为 TransactionResponse 可校验的 dict"""
+    data = dict(row._mapping)
+    filelist = data.get("filelist")
+    if isinstance(filelist, (str, bytes)):
+        filelist = json.loads(filelist)
+    # PostgreSQL 上没有附件时 json_agg 返回 NULL
+    data["filelist"] = filelist or []
+    data["create_username"] = data.get("create_username") or ""
+    return data
+
+
+# ====== 汇总表增量维护 ======
+
+def summary_delta(tx_type: TransactionType, amount: Decimal, sign: int = 1) -> tuple[int, Decimal, Decimal]:
+    """单条交易对汇总的贡献：(笔数, 收入, 支出)，sign=-1 表示撤销"""
+    income = amount if tx_type == TransactionType.INCOME else Decimal("0")
+    expense = amount if tx_type == TransactionType.EXPENSE else Decimal("0")
+    return sign, sign * income, sign * expense
+
+
+def build_summary_upsert(
+    dialect_name: str,
+    userid: str,
+    count_delta: int,
+    income_delta: Decimal,
+    expense_delta: Decimal,
+):
+    """
+    原子地把增量累加到汇总表：INSERT ... ON CONFLICT (userid) DO UPDATE SET x = x + :delta
+    与业务写入放在同一事务里，提交/回滚保持一致
+    """
+    st = UserTransactionSummary
+    dialect_insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = dialect_insert(st).values(
+        userid=userid,
+        total_transactions=count_delta,
+        total_income=income_delta,
+        total_expense=expense_delta,
+        change_seq=1,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[st.userid],
+        set_={
+            "total_transactions": st.total_transactions + count_delta,
+            "total_income": st.total_income + income_delta,
+            "total_expense": st.total_expense + expense_delta,
+            "updated_at": func.now(),
+            "change_seq": st.change_seq + 1,
+        },
+    )
+
+
+def build_summary_aggregate() -> Select:
+    """从明细表重新聚合出每个用户的汇总，用于全量重建与校验"""
+    t = Transaction
+    return (
+        select(
+            User.userid.label("userid"),
+            func.count(t.transaction_id).label("total_transactions"),
+            func.coalesce(func.sum(case((t.type == TransactionType.INCOME, t.amount), else_=0)), 0).label("total_income"),
+            func.coalesce(func.sum(case((t.type == TransactionType.EXPENSE, t.amount), else_=0)), 0).label("total_expense"),
+        )
+        .select_from(User)
+        .outerjoin(t, t.create_userid == User.userid)
+        .group_by(User.userid)
+    )
+
+
+def build_summary_rebuild() -> list:
+    """全量重建汇总表（DELETE + INSERT ... SELECT），需在同一事务中依次执行"""
+    agg = build_summary_aggregate().subquery()
+    st = UserTransactionSummary
+    return [
+        delete(st),
+        insert(st).from_select(
+            ["userid", "total_transactions", "total_income", "total_expense"],
+            select(agg.c.userid, agg.c.total_transactions, agg.c.total_income, agg.c.total_expense),
+        ),
+    ]
+
+
+def build_summary_verify() -> Select:
+    """列出汇总表与明细聚合不一致的用户（缺行按 0 处理），金额为 NUMERIC，直接精确比较"""
+    agg = build_summary_aggregate().subquery()
+    st = UserTransactionSummary
+    stored_count = func.coalesce(st.total_transactions, 0)
+    stored_income = func.coalesce(st.total_income, 0)
+    stored_expense = func.coalesce(st.total_expense, 0)
+    return (
+        select(
+            agg.c.userid,
+            agg.c.total_transactions,
+            stored_count.label("stored_transactions"),
+            agg.c.total_income,
+            stored_income.label("stored_income"),
+            agg.c.total_expense,
+            stored_expense.label("stored_expense"),
+        )
+        .select_from(agg)
+        .outerjoin(st, st.userid == agg.c.userid)
+        .where(
+            (agg.c.total_transactions != stored_count)
+            | (agg.c.total_income != stored_income)
+            | (agg.c.total_expense != stored_expense)
+        )
+    )
+
+
+# ====== 日汇总（统计图表） ======
+
+def stats_day(ts: datetime) -> date:
+    """交易时间 -> 统计用的自然日（按 STATS_TIMEZONE 划分，无时区的时间视为 UTC）"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(ZoneInfo(settings.STATS_TIMEZONE)).date()
+
+
+def daily_delta_rows(
+    userid: str,
+    entries: Iterable[tuple[datetime, TransactionType, Decimal, int]],
+) -> list[dict]:
+    """
+    (交易时间, 类型, 金额, sign) 列表 -> 日汇总增量行
+    同一 (日, 类型) 先在内存中合并：同一条 INSERT ... ON CONFLICT 里不能出现重复主键
+    """
+    merged: dict[tuple[date, TransactionType], list] = {}
+    for ts, tx_type, amount, sign in entries:
+        acc = merged.setdefault((stats_day(ts), tx_type), [0, Decimal("0")])
+        acc[0] += sign
+        acc[1] += sign * amount
+    return [
+        {"userid": userid, "day": day, "type": tx_type, "total_count": cnt, "total_amount": amt}
+        for (day, tx_type), (cnt, amt) in merged.items()
+    ]
+
+
+def build_daily_upsert(dialect_name: str, rows: list[dict]):
+    """多行增量一次写入：ON CONFLICT (userid, day, type) DO UPDATE SET x = x + excluded.x"""
+    dt = UserTransactionDaily
+    dialect_insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = dialect_insert(dt).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[dt.userid, dt.day, dt.type],
+        set_={
+            "total_count": dt.total_count + stmt.excluded.total_count,
+            "total_amount": dt.total_amount + stmt.excluded.total_amount,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _stats_period(dialect_name: str, day, granularity: StatsGranularity):
+    """日期截断到时间桶起点：PostgreSQL 用 date_trunc，SQLite 用等价的 date() 修饰符，周从周一开始"""
+    if granularity == StatsGranularity.DAY:
+        return day
+    if dialect_name == "sqlite":
+        if granularity == StatsGranularity.WEEK:
+            return type_coerce(func.date(day, "-6 days", "weekday 1"), Date)
+        return type_coerce(func.date(day, "start of month"), Date)
+    return cast(func.date_trunc(granularity.value, day), Date)
+
+
+def build_daily_stats(
+    dialect_name: str,
+    userid: str,
+    granularity: StatsGranularity,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tx_type: Optional[TransactionType] = None,
+) -> Select:
+    """
+    按时间桶聚合日汇总：主键 (userid, day, type) 范围扫描后在库内 GROUP BY，
+    每个桶返回一行 (period, income, expense, count)
+    """
+    dt = UserTransactionDaily
+    period = _stats_period(dialect_name, dt.day, granularity).label("period")
+    stmt = (
+        select(
+            period,
+            func.coalesce(func.sum(case((dt.type == TransactionType.INCOME, dt.total_amount), else_=0)), 0).label("income"),
+            func.coalesce(func.sum(case((dt.type == TransactionType.EXPENSE, dt.total_amount), else_=0)), 0).label("expense"),
+            func.coalesce(func.sum(dt.total_count), 0).label("count"),
+        )
+        .where(dt.userid == userid, dt.total_count != 0)
+    )
+    if date_from:
+        stmt = stmt.where(dt.day >= date_from)
+    if date_to:
+        stmt = stmt.where(dt.day <= date_to)
+    if tx_type:
+        stmt = stmt.where(dt.type == tx_type)
+    return stmt.group_by(period).order_by(period)
+
+
+def build_daily_rebuild() -> list:
+    """全量重建日汇总（DELETE + INSERT ... SELECT，仅 PostgreSQL），需在同一事务中执行"""
+    t = Transaction
+    dt = UserTransactionDaily
+    days = select(
+        t.create_userid.label("userid"),
+        cast(func.timezone(settings.STATS_TIMEZONE, t.created_at), Date).label("day"),
+        t.type.label("type"),
+        t.amount.label("amount"),
+    ).subquery()
+    agg = select(
+        days.c.userid,
+        days.c.day,
+        days.c.type,
+        func.count(),
+        func.coalesce(func.sum(days.c.amount), 0),
+    ).group_by(days.c.userid, days.c.day, days.c.type)
+    return [
+        delete(dt),
+        insert(dt).from_select(["userid", "day", "type", "total_count", "total_amount"], agg),
+    ]
+
+
+def bucket_start(day: date, granularity: StatsGranularity) -> date:
+    """与 date_trunc 相同的截断规则：周从周一开始"""
+    if granularity == StatsGranularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == StatsGranularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: date, granularity: StatsGranularity) -> date:
+    if granularity == StatsGranularity.WEEK:
+        return start + timedelta(days=7)
+    if granularity == StatsGranularity.MONTH:
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def fill_stats_buckets(
+    rows: Iterable,
+    granularity: StatsGranularity,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> list[dict]:
+    """
+    build_daily_stats 已按桶聚合好的行转换为响应项；给定完整区间时补齐没有数据的桶，方便前端直接画图
+    """
+    buckets: dict[date, dict] = {}
+
+    def bucket(start: date) -> dict:
+        return buckets.setdefault(start, {"period": start, "income": Decimal("0"), "expense": Decimal("0"), "count": 0})
+
+    if date_from and date_to:
+        start, end = bucket_start(date_from, granularity), bucket_start(date_to, granularity)
+        while start <= end:
+            if len(buckets) >= settings.STATS_MAX_BUCKETS:
+                raise BizException(code=400, message="统计区间过大，请缩小范围或使用更粗的粒度")
+            bucket(start)
+            start = _next_bucket(start, granularity)
+
+    for row in rows:
+        b = bucket(row.period)
+        b["income"] += Decimal(row.income)
+        b["expense"] += Decimal(row.expense)
+        b["count"] += row.count
+    return [buckets[k] for k in sorted(buckets)]
+
+
+# ====== 批量写入 ======
+
+def build_transaction_rows(items: Iterable[TransactionCreate], userid: str, now: datetime) -> list[dict]:
+    """
+    把新增请求转换为 insert 参数列表，主键在应用侧生成，方便同批次关联文件
+    created_at 按提交顺序逐条递增 1 微秒：排序与游标分页按 (created_at, transaction_id)，
+    时间相同会退化为按随机 uuid 排序
+    """
+    return [
+        {
+            "transaction_id": uuid4().hex,
+            "create_userid": userid,
+            "created_at": now + timedelta(microseconds=i),
+            **item.model_dump(exclude={"filelist", "delFileids", "transaction_id"}),
+        }
+        for i, item in enumerate(items)
+    ]
+
+
+def build_fileasset_rows(business_id: str, userid: str, filelist: Iterable[FileInfo], now: datetime) -> list[dict]:
+    """交易附件 insert 参数列表"""
+    return [
+        {
+            "fileid": uuid4().hex,
+            "business_id": business_id,
+            "filepath": file.filepath,
+            "type": "transactions",
+            "userid": userid,
+            "created_at": now,
+            "status": FileStatus.ACTIVE,
+            "category": file.photo_id,
+        }
+        for file in filelist
+    ]
+
+
+def build_transaction_bulk_insert():
+    """批量插入交易，配合参数列表执行（insertmanyvalues 合并为多行 VALUES），按参数顺序返回主键"""
+    return insert(Transaction).returning(Transaction.transaction_id, sort_by_parameter_order=True)
+
+
+def build_fileasset_bulk_insert():
+    """批量插入附件，配合参数列表执行"""
+    return insert(Fileassets)
+
+
+def build_fileasset_soft_delete(business_id: str, fileids: Iterable[str], userid: str, now: datetime):
+    """
+    单条语句软删除附件，返回实际命中的 fileid
+    business_id 条件保证只能删除当前交易自己的附件，未命中的 fileid 由调用方忽略
+    """
+    return (
+        update(Fileassets)
+        .where(Fileassets.fileid.in_(list(fileids)), Fileassets.business_id == business_id)
+        .values(status=FileStatus.DELETED, update_userid=userid, updated_at=now)
+        .returning(Fileassets.fileid)
+        .execution_options(synchronize_session=False)
+    )
@@ -25,4 +25,21 @@ class MenuType(str, Enum):
 
 class ResourceType(str, Enum):
     MENU = "MENU"
-    BUTTON = "BUTTON"
\ No newline at end of file
+    BUTTON = "BUTTON"
+
+class CountMode(str, Enum):
+    EXACT = "EXACT"        # 单独 COUNT(*)，与旧版行为一致
+    WINDOW = "WINDOW"      # COUNT(*) OVER() 与分页数据同一条 SQL 返回
+    ESTIMATE = "ESTIMATE"  # 结果集较大时使用执行计划估算的行数
+
+class StatsGranularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"      # 周一为一周的开始
+    MONTH = "month"
+
+class ExportFormat(str, Enum):
+    XLSX = "xlsx"
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+    FEATHER = "feather"    # Arrow IPC 文件格式
@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 from fastapi import FastAPI
@@ -24,7 +25,8 @@ from app.core.middleware import (
     SecurityHeadersMiddleware,
 )
 from app.core.audit_middleware import AuditMiddleware
-from app.db.db_session import init_db
+from app.core.cache import run_invalidation_listener
+from app.db.db_session import async_engine, init_db
 from app.db.redis_session import close_redis, init_redis
 from app.routers import auth, basic, system, transactions, videoserver
 
@@ -80,6 +82,8 @@ async def startup_event():
         redis_client = await init_redis()
         await FastAPILimiter.init(redis_client)
         app.state.redis = redis_client
+        # 订阅缓存失效消息，清理本进程的 L1 缓存
+        app.state.cache_listener = asyncio.create_task(run_invalidation_listener(redis_client))
     except Exception as e:
         print(f"Warning: Failed to initialize Redis or FastAPILimiter: {e}")
     
@@ -93,12 +97,22 @@ async def shutdown_event():
     except Exception as e:
         print(f"Warning: FastAPILimiter.close failed: {e}")
 
+    listener = getattr(app.state, "cache_listener", None)
+    if listener is not None:
+        listener.cancel()
+
     # redis 关闭也做保护
     try:
         await close_redis()
     except Exception as e:
         print(f"Warning: close_redis failed: {e}")
 
+    # 释放异步数据库连接池
+    try:
+        await async_engine.dispose()
+    except Exception as e:
+        print(f"Warning: async_engine.dispose failed: {e}")
+
 
 # @app.get("/docs", include_in_schema=False)
 # async def custom_swagger_ui_html():
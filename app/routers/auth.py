@@ -1,11 +1,14 @@
 from datetime import datetime, timezone
+import hashlib
 import json
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Body, Depends, Form
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_limiter.depends import RateLimiter
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -15,9 +18,11 @@ from app.core.crypto_sm2 import (
     sm2_decrypt_hex,
     sm2_encrypt_hex,
 )
-from app.core.deps import get_current_user, get_sm2_client
+from app.core.deps import AuthContext, get_auth_context, get_current_user, get_sm2_client
 from app.core.exceptions import BizException
 from app.core.logging import auth_logger
+from app.core.permissions import PermissionIndex, permission_registry
+from app.core.principal import invalidate_principal, invalidate_user_principals
 from app.core.security import (
     create_access_token,
     create_refresh_token,
@@ -37,8 +42,9 @@ from app.core.session_store import (
     set_active_sid,
     set_session_kv,
 )
-from app.db.db_session import get_db
+from app.db.db_session import get_async_db, get_db
 from app.db.models import Resource, Role, RoleAreaGrant, User, UserRoleScope
+from app.db.redis_session import get_redis_client
 from app.domains.enums import ResourceType, UserStatus
 from app.schemas.auth import LoginModel, RegisterIn, RoleOut, TokenWithRefresh, UserOut, SwitchRoleIn
 from app.schemas.response import R
@@ -59,13 +65,13 @@ def register(payload: RegisterIn, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=R[TokenWithRefresh], dependencies=[Depends(RateLimiter(times=5, seconds=60))])
-async def login(request: Request, payload: LoginModel, db: Session = Depends(get_db)):
+async def login(request: Request, payload: LoginModel, db: AsyncSession = Depends(get_async_db)):
     sm2_no_login = make_sm2(settings.SM2_PRIVATE_KEY_NOLOGIN, settings.SM2_PUBLIC_KEY_NOLOGIN)
     # username = sm2_no_login.decrypt(bytes.fromhex(payload.username)).decode("utf-8")
     username = sm2_decrypt_hex(sm2_no_login, payload.username)
     password = sm2_decrypt_hex(sm2_no_login, payload.password)
 
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if not user or not verify_password(password, user.password_hash):
         raise BizException(message="用户名或密码错误")
 
@@ -130,7 +136,7 @@ async def login(request: Request, payload: LoginModel, db: Session = Depends(get
 @router.post("/refresh", response_model=R[TokenWithRefresh], dependencies=[Depends(RateLimiter(times=5, seconds=60))])
 async def refresh_token(
     refresh_token: str = Form(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """使用刷新令牌获取新的访问令牌和刷新令牌"""
     try:
@@ -149,7 +155,7 @@ async def refresh_token(
             raise BizException(message="无效的刷新令牌")
         
         # 验证用户是否存在
-        user = db.query(User).filter(User.userid == user_id).first()
+        user = await db.scalar(select(User).where(User.userid == user_id))
         if not user:
             raise BizException(message="用户不存在")
         
@@ -200,7 +206,7 @@ async def switch_role(
     role_id: str = Body(),
     cli_pubkey: str = Body(),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not role_id:
         raise BizException(message="角色ID不能为空")
@@ -215,6 +221,7 @@ async def switch_role(
         # 清除 active_sid 指针
         if await get_active_sid(current_user.userid) == sid:
             await clear_active_sid(current_user.userid)
+        await invalidate_principal(get_redis_client(), current_user.userid, sid)
 
     new_sid = new_session_id()
     await add_user_session(current_user.userid, new_sid)
@@ -247,14 +254,14 @@ async def switch_role(
 async def set_default_role(
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     data = await request.json()
     role_id = data.get("role_id")
     if not role_id:
         raise BizException(message="角色ID不能为空")
     
-    user = db.query(User).filter(User.userid == current_user.userid).first()
+    user = await db.scalar(select(User).where(User.userid == current_user.userid))
     if not user:
         raise BizException(message="用户不存在")
 
@@ -269,8 +276,8 @@ async def set_default_role(
     else:
         user.default_role_id = role_id
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await invalidate_user_principals(get_redis_client(), current_user.userid)
     
     return R.ok(message="默认角色设置成功", data={
         "default_role_id": user.default_role_id,
@@ -288,15 +295,18 @@ async def logout(current_user: User = Depends(get_current_user)):
     # 只在当前 sid 为 active 时清空指针，防并发误删
     if await get_active_sid(current_user.userid) == sid:
         await clear_active_sid(current_user.userid)
+    await invalidate_principal(get_redis_client(), current_user.userid, sid)
 
     return R.ok(message="退出成功")
 
 
 @router.get("/me", response_model=R[UserOut])
-async def me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), sm2_client= Depends(get_sm2_client)):
-    user = db.query(User).filter(User.userid == current_user.userid).first()
+async def me(ctx: AuthContext = Depends(get_auth_context), db: AsyncSession = Depends(get_async_db)):
+    current_user = ctx.principal
+    user = await ctx.load_user(db)
     if not user:
         raise BizException(message="用户不存在")
+    sm2_client = ctx.sm2_client()
 
     try:
         user_out = UserOut(
@@ -319,91 +329,64 @@ async def me(current_user: User = Depends(get_current_user), db: Session = Depen
         raise BizException(message="获取用户信息失败")
 
 
+def _render_menu_tree(index: PermissionIndex, role_id: Optional[str]) -> Tuple[bytes, str]:
+    """渲染完整响应体并计算 ETag，结果随权限索引缓存，索引版本变化时自动失效"""
+    body = R.ok(data=index.menu_tree(role_id)).model_dump_json().encode()
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 @router.get("/getMenuTree", response_model=R)
-async def get_menu_tree(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """获取菜单树"""
-    try:
-        # 查询所有菜单资源
-        menu_resources : List[Resource] = db.query(Resource).filter(
-            Resource.rtype == ResourceType.MENU,
-            Resource.status == 1,
-        ).order_by(Resource.sort).all()
-        # 查询当前用户角色的权限
-        grants : List[RoleAreaGrant] = db.query(RoleAreaGrant).filter(
-            RoleAreaGrant.role_id == current_user.role_id,
-            RoleAreaGrant.is_grant == 1
-        ).all()
-        granted_ids = {g.rid for g in grants}
-
-        resources_by_parent: dict[str | None, List[Resource]] = {}
-        for res in menu_resources:
-            resources_by_parent.setdefault(res.parent_id, []).append(res)
-        
-        def has_permission(resource: Resource):
-            return resource.rid in granted_ids
-        
-        def build_menu_node(resource: Resource):
-            """递归构建菜单节点"""
-            node = {
-                "id": resource.rid,
-                "name": resource.rname,
-                "code": resource.rcode,
-                "path": resource.path,
-                "icon": resource.icon,
-                "menuType": resource.menu_type,
-                "children": [],
-            }
-            children = sorted(resources_by_parent.get(resource.rid, []), key=lambda x: x.sort or 0)
-            for child in children:
-                if has_permission(child):
-                    node["children"].append(build_menu_node(child))
-            return node
-        
-        # 构建菜单树
-        menu_tree = []
-        top_resources = sorted(resources_by_parent.get(None, []), key=lambda x: x.sort or 0)
-        for res in top_resources:
-            if has_permission(res):
-                menu_tree.append(build_menu_node(res))
-        
-        return R.ok(data=menu_tree)
-    except Exception as e:
-        raise BizException(message="获取菜单树失败")
+async def get_menu_tree(request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """获取菜单树：同一角色在权限未变化时直接返回预渲染的 JSON，客户端带 If-None-Match 命中时返回 304"""
+    index = await permission_registry.get(get_redis_client(), db)
+    role_id = current_user.role_id
+    body, etag = index.cached_render(f"menu_tree:{role_id}", lambda: _render_menu_tree(index, role_id))
+
+    # 内容随角色变化，只允许客户端私有缓存，每次使用前回源校验
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _button_items(buttons) -> List[dict]:
+    return [{"id": res.rid, "name": res.rname, "code": res.rcode} for res in buttons]
 
 
 @router.get("/getButtonRight", response_model=R)
-async def get_button_right(menu_code: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_button_right(menu_code: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """获取按钮权限"""
     if not menu_code:
         raise BizException(message="菜单编码不能为空")
 
-    menu = db.query(Resource).filter(Resource.rcode == menu_code).first()
-    if not menu:
+    index = await permission_registry.get(get_redis_client(), db)
+    if index.resource_by_code(menu_code) is None:
         raise BizException(message="菜单不存在")
 
-    try:
-        authorized_buttons = db.query(Resource).join(
-            RoleAreaGrant,
-            and_(
-                Resource.rid == RoleAreaGrant.rid,
-                RoleAreaGrant.role_id == current_user.role_id,
-                RoleAreaGrant.is_grant == 1,
-            ),
-        ).filter(
-            Resource.parent_id == menu.rid,
-            Resource.rtype == ResourceType.BUTTON,
-            Resource.status == 1,
-        ).all()
-
-        result = [
-            {
-                "id": res.rid,
-                "name": res.rname,
-                "code": res.rcode,
-            }
-            for res in authorized_buttons
-        ]
-        return R.ok(data=result)
-    except Exception as e:
-        auth_logger.error(f"获取按钮权限失败: {str(e)}")
-        raise BizException(message="获取按钮权限失败")
\ No newline at end of file
+    return R.ok(data=_button_items(index.granted_buttons(current_user.role_id, menu_code)))
+
+
+@router.get("/getButtonRights", response_model=R)
+async def get_button_rights(menu_codes: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """
+    批量获取按钮权限，返回 {菜单编码: 按钮列表}
+    menu_codes 为英文逗号分隔的菜单编码；不传时返回当前角色全部菜单下的按钮
+    不存在或没有授权按钮的菜单返回空列表
+    """
+    index = await permission_registry.get(get_redis_client(), db)
+    role_id = current_user.role_id
+    if not menu_codes:
+        return R.ok(data=index.cached_render(
+            f"buttons:{role_id}",
+            lambda: {code: _button_items(items) for code, items in index.buttons.get(role_id, {}).items()},
+        ))
+
+    codes = dict.fromkeys(c.strip() for c in menu_codes.split(",") if c.strip())
+    return R.ok(data={code: _button_items(index.granted_buttons(role_id, code)) for code in codes})
\ No newline at end of file
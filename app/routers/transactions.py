@@ -4,31 +4,77 @@ from math import e
 import os
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi_limiter.depends import RateLimiter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.audit import audit_log
 from app.core.audit import OperationType, RiskLevel, audit_transaction
+from app.core.cache import stats_cache, transaction_cache
 from app.core.config import settings
-from app.core.deps import get_current_user, get_db, require_code
+from app.core.deps import get_async_db, get_current_user, get_db, require_code
 from app.core.exceptions import BizException
+from app.core.export_registry import (
+    dispatch_export,
+    dispatch_sharded_export,
+    export_watermark,
+    sharded_export_status,
+)
 from app.core.idempotency import ensure_idempotency, idem_done, idem_unlock
+from app.core.logging import get_logger
+from app.core.pagination import decode_keyset, encode_keyset
 from app.core.signing import verify_signature
-from app.db.models import Fileassets, Transaction, User, UserTransactionSummaryView
+from app.db.db_session import SessionLocal
+from app.db.models import Fileassets, Transaction, User, UserTransactionSummary
 from app.db.redis_session import get_redis_client
-from app.domains.enums import FileStatus
-from app.schemas.basic import PageResult
+from app.db.transaction_repo import (
+    TRANSACTION_ORDER_BY,
+    build_count_estimate,
+    build_daily_stats,
+    build_daily_upsert,
+    build_fileasset_bulk_insert,
+    build_fileasset_rows,
+    build_fileasset_soft_delete,
+    build_keyset_page,
+    build_snapshot_filter,
+    build_summary_upsert,
+    build_transaction_bulk_insert,
+    build_transaction_detail,
+    build_transaction_delete,
+    build_transaction_filters,
+    build_transaction_locked,
+    build_transaction_lookup,
+    build_transaction_rows,
+    build_windowed_page,
+    daily_delta_rows,
+    fill_stats_buckets,
+    plan_rows,
+    split_keyset_rows,
+    summary_delta,
+    summary_extras_from_row,
+    transaction_detail_from_row,
+)
+from app.domains.enums import CountMode, ExportFormat
+from app.schemas.basic import CursorPageResult, PageResult
 from app.schemas.response import R
 from app.schemas.transactions import (
+    TransactionBatchCreate,
     TransactionCreate,
+    TransactionCursorQuery,
     TransactionListQuery,
     TransactionResponse,
+    TransactionStatsQuery,
+    TransactionStatsResult,
 )
 from app.tasks.celery_tasks import export_transactions_by_user_task
+from app.tasks.export_reporter import encode_csv, encode_ndjson, iter_export_batches
 
 
 router = APIRouter()
+tx_logger = get_logger("transactions")
 
 
 @router.post("/addRecord", response_model=R, description="添加交易记录", dependencies=[Depends(require_code('add_record'))])
@@ -36,7 +82,7 @@ async def create_transaction(
     request: Request,
     transaction: TransactionCreate, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     idem = Depends(ensure_idempotency),
     redis_client = Depends(get_redis_client),
 ):
@@ -47,7 +93,8 @@ async def create_transaction(
     try:
         if transaction.transaction_id:
             # 检查是否已存在
-            existing = db.query(Transaction).filter(Transaction.transaction_id == transaction.transaction_id).first()
+            # 加锁读取：旧值用于撤销汇总贡献，并发修改同一条记录时排队执行
+            existing = await db.scalar(build_transaction_locked(transaction.transaction_id, db.bind.dialect.name))
 
             if not existing:
                 raise BizException(message="交易ID不存在，无法修改")
@@ -55,14 +102,21 @@ async def create_transaction(
             if existing.create_userid != current_user.userid:
                 raise BizException(message="您没有权限修改此交易记录")
 
+            # 先撤销旧值对汇总的贡献，再累加新值
+            old_delta = summary_delta(existing.type, existing.amount, sign=-1)
+            new_delta = summary_delta(transaction.type, transaction.amount)
+            deltas = tuple(o + n for o, n in zip(old_delta, new_delta))
+            daily = [
+                (existing.created_at, existing.type, existing.amount, -1),
+                (existing.created_at, transaction.type, transaction.amount, 1),
+            ]
+
             data = transaction.model_dump(exclude={"filelist", "delFileids"})
             for k, v in data.items():
                 setattr(existing, k, v)
             existing.update_userid = current_user.userid
             existing.update_at = datetime.now(timezone.utc)
             db_transaction = existing
-
-            await redis_client.delete(f"transaction:{transaction.transaction_id}")
         else:
             db_transaction = Transaction(
                 create_userid=current_user.userid, 
@@ -70,33 +124,41 @@ async def create_transaction(
                 **transaction.model_dump(exclude={"filelist", "delFileids"})
             )
             db.add(db_transaction)
+            deltas = summary_delta(transaction.type, transaction.amount)
+            daily = [(db_transaction.created_at, transaction.type, transaction.amount, 1)]
 
-        db.commit()
-        db.refresh(db_transaction)
+        await db.execute(build_summary_upsert(db.bind.dialect.name, current_user.userid, *deltas))
+        await db.execute(build_daily_upsert(db.bind.dialect.name, daily_delta_rows(current_user.userid, daily)))
+        # flush 拿到主键即可，附件与交易在同一事务里提交
+        await db.flush()
 
+        now = datetime.now(timezone.utc)
         if transaction.filelist:
-            for file in transaction.filelist:
-                db_filelist = Fileassets(
-                    business_id=db_transaction.transaction_id, 
-                    filepath=file.filepath, 
-                    type='transactions', 
-                    userid=current_user.userid,
-                    created_at=datetime.now(timezone.utc),
-                    status=FileStatus.ACTIVE,
-                    category=file.photo_id,
-                )
-                db.add(db_filelist)
+            await db.execute(
+                build_fileasset_bulk_insert(),
+                build_fileasset_rows(db_transaction.transaction_id, current_user.userid, transaction.filelist, now),
+            )
 
         if transaction.delFileids:
-            for fileid in transaction.delFileids.split(','):
-                db_filelist = db.query(Fileassets).filter(Fileassets.fileid == fileid).first()
-                if db_filelist:
-                    db_filelist.status = FileStatus.DELETED
-                    db_filelist.update_userid = current_user.userid
-                    db_filelist.update_at = datetime.now(timezone.utc)
-                    db.add(db_filelist)
+            fileids = {fid.strip() for fid in transaction.delFileids.split(',') if fid.strip()}
+            if fileids:
+                # 单条 UPDATE ... WHERE fileid IN (...) AND business_id = :tx，只作用于本交易的附件
+                deleted = set((await db.scalars(build_fileasset_soft_delete(
+                    db_transaction.transaction_id, fileids, current_user.userid, now
+                ))).all())
+                # 与原逻辑一致：不存在或不属于该交易的文件直接忽略，只记日志
+                if deleted != fileids:
+                    tx_logger.warning(
+                        f"delFileids 忽略未命中的文件: transaction_id={db_transaction.transaction_id}, "
+                        f"fileids={sorted(fileids - deleted)}"
+                    )
+
+        await db.commit()
 
-        db.commit()
+        if transaction.transaction_id:
+            # 提交后再失效，避免并发读把旧数据写回缓存
+            await transaction_cache.bump(redis_client, transaction.transaction_id)
+        await stats_cache.bump(redis_client, current_user.userid)
 
         # 统一返回体（包含业务主键更实用）
         resp_obj = R.ok(message="保存成功", data={
@@ -107,15 +169,77 @@ async def create_transaction(
         return resp_obj
 
     except BizException as e:
-        db.rollback()
+        await db.rollback()
         await idem_unlock(request)
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         await idem_unlock(request)
         raise BizException(message=f"保存失败: {str(e)}")
     
 
+@router.post("/addRecords", response_model=R, description="批量添加交易记录", dependencies=[Depends(require_code('add_record'))])
+async def create_transactions_batch(
+    request: Request,
+    payload: TransactionBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    idem = Depends(ensure_idempotency),
+    redis_client = Depends(get_redis_client),
+):
+    _, replay = idem
+    if replay:
+        return replay
+
+    try:
+        if any(item.transaction_id or item.delFileids for item in payload.items):
+            raise BizException(code=400, message="批量接口仅支持新增，修改请使用 addRecord")
+
+        now = datetime.now(timezone.utc)
+        tx_rows = build_transaction_rows(payload.items, current_user.userid, now)
+
+        # 单条 INSERT ... VALUES (...), (...) RETURNING，一次往返写入全部交易
+        transaction_ids = (await db.scalars(build_transaction_bulk_insert(), tx_rows)).all()
+
+        file_rows = []
+        for tx_id, item in zip(transaction_ids, payload.items):
+            if item.filelist:
+                file_rows += build_fileasset_rows(tx_id, current_user.userid, item.filelist, now)
+        if file_rows:
+            await db.execute(build_fileasset_bulk_insert(), file_rows)
+
+        # 汇总表按批次合并为一次增量
+        deltas = [summary_delta(item.type, item.amount) for item in payload.items]
+        await db.execute(build_summary_upsert(
+            db.bind.dialect.name,
+            current_user.userid,
+            *map(sum, zip(*deltas)),
+        ))
+        await db.execute(build_daily_upsert(
+            db.bind.dialect.name,
+            daily_delta_rows(current_user.userid, [(row["created_at"], row["type"], row["amount"], 1) for row in tx_rows]),
+        ))
+
+        await db.commit()
+        await stats_cache.bump(redis_client, current_user.userid)
+
+        resp_obj = R.ok(message="保存成功", data={
+            "transaction_ids": list(transaction_ids)
+        }).model_dump()
+
+        await idem_done(request, resp_obj, status_code=200)
+        return resp_obj
+
+    except BizException as e:
+        await db.rollback()
+        await idem_unlock(request)
+        raise
+    except Exception as e:
+        await db.rollback()
+        await idem_unlock(request)
+        raise BizException(message=f"保存失败: {str(e)}")
+
+
 @router.get("/getRecords", response_model=R[PageResult[TransactionResponse]], description="获取交易记录列表", dependencies=[Depends(verify_signature), Depends(RateLimiter(times=10, seconds=60))])
 def get_transactions(
     form: TransactionListQuery = Depends(), 
@@ -124,40 +248,50 @@ def get_transactions(
 ):
     userid = form.userid or current_user.userid
     
-    # 查询交易记录
-    query = db.query(Transaction).filter(Transaction.create_userid == userid).order_by(Transaction.created_at.desc())
-    
-    if form.date_from:
-        query = query.filter(Transaction.created_at >= form.date_from)
-    if form.date_to:
-        query = query.filter(Transaction.created_at <= form.date_to)
-    if form.type:
-        query = query.filter(Transaction.type == form.type)
-    if form.min_amount is not None:
-        query = query.filter(Transaction.amount >= form.min_amount)
-    if form.max_amount is not None:
-        query = query.filter(Transaction.amount <= form.max_amount)
-    if form.keyword:
-        query = query.filter(Transaction.remark.ilike(f"%{form.keyword}%") | Transaction.type.ilike(f"%{form.keyword}%"))
-    
-    total = query.count()
+    conds = build_transaction_filters(form, userid, db.bind.dialect.name)
+    if form.snapshot:
+        # 后续页：限定在第一页记录的高水位之内，新增数据不会造成重复/遗漏
+        conds.append(build_snapshot_filter(decode_keyset(form.snapshot)))
+    offset = (form.page - 1) * form.page_size
+
+    if form.count_mode == CountMode.EXACT:
+        # 旧版行为：单独 COUNT(*) + 分页 + 汇总，三次查询
+        query = db.query(Transaction).filter(*conds).order_by(*TRANSACTION_ORDER_BY)
+        total = query.count()
+        rows = query.offset(offset).limit(form.page_size).all()
+        extras = _get_summary_extras(db, userid)
+    else:
+        estimated = None
+        if form.count_mode == CountMode.ESTIMATE and db.bind.dialect.name == "postgresql":
+            estimated = plan_rows(db.execute(build_count_estimate(conds)).scalar())
+            if estimated is not None and estimated < settings.COUNT_ESTIMATE_THRESHOLD:
+                # 结果集不大时精确计数的代价可以忽略，仍然走窗口计数
+                estimated = None
+
+        # 一次往返取回分页数据、总数（窗口函数）与用户汇总
+        result = db.execute(build_windowed_page(conds, userid, offset, form.page_size, with_total=estimated is None)).all()
+        rows = [r[0] for r in result]
+
+        if result:
+            total = estimated if estimated is not None else result[0].total
+            extras = summary_extras_from_row(result[0])
+        else:
+            # 超出末页时窗口函数拿不到总数，退回单独查询
+            total = db.query(Transaction).filter(*conds).count()
+            extras = _get_summary_extras(db, userid)
+            estimated = None
 
-    rows = query.offset((form.page - 1) * form.page_size).limit(form.page_size).all()
+        if estimated is not None:
+            extras["total_estimated"] = True
     
+    if form.snapshot:
+        extras["snapshot"] = form.snapshot
+    elif form.page == 1 and rows:
+        # 第一页按 created_at/transaction_id 倒序，首行即高水位，无需额外查询
+        extras["snapshot"] = encode_keyset(rows[0].created_at, rows[0].transaction_id)
+
     items = [TransactionResponse.model_validate(t) for t in rows]
 
-    # 使用SQLAlchemy的Table对象查询视图
-    summary = db.query(UserTransactionSummaryView).filter(UserTransactionSummaryView.userid == userid).first()
-    
-    # 处理可能的None情况，并使用字典访问方式获取字段值
-    extras = {}
-    if summary:
-        extras = {
-            "total_transactions": summary.total_transactions,
-            "total_income": summary.total_income,
-            "total_expense": summary.total_expense,
-        }
-    
     page = PageResult[TransactionResponse](
         page=form.page, 
         page_size=form.page_size, 
@@ -169,67 +303,137 @@ def get_transactions(
     return R.ok(data=page)
 
 
+@router.get("/getRecordsByCursor", response_model=R[CursorPageResult[TransactionResponse]], description="获取交易记录列表（游标分页）", dependencies=[Depends(verify_signature), Depends(RateLimiter(times=10, seconds=60))])
+def get_transactions_by_cursor(
+    form: TransactionCursorQuery = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    userid = form.userid or current_user.userid
+
+    after = decode_keyset(form.cursor) if form.cursor else None
+    stmt = build_keyset_page(build_transaction_filters(form, userid, db.bind.dialect.name), form.page_size, after=after)
+    rows, has_more = split_keyset_rows(db.scalars(stmt).all(), form.page_size)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_keyset(last.created_at, last.transaction_id)
+
+    page = CursorPageResult[TransactionResponse](
+        page_size=form.page_size,
+        items=[TransactionResponse.model_validate(t) for t in rows],
+        next_cursor=next_cursor,
+        has_more=has_more,
+        # 汇总只在第一页返回，后续翻页不再重复查询
+        extras=_get_summary_extras(db, userid) if not form.cursor else None,
+    )
+
+    return R.ok(data=page)
+
+
+def _get_summary_extras(db: Session, userid: str) -> dict:
+    # 汇总表按主键取一行，O(1)，不再重新聚合全部明细
+    summary = db.get(UserTransactionSummary, userid)
+    return summary_extras_from_row(summary)
+
+
+@router.get("/stats", response_model=R[TransactionStatsResult], description="按日/周/月统计收入、支出与笔数", dependencies=[Depends(RateLimiter(times=30, seconds=60))])
+async def get_transaction_stats(
+    form: TransactionStatsQuery = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    redis_client = Depends(get_redis_client),
+):
+    # 只统计当前登录用户自己的数据
+    userid = current_user.userid
+    if form.date_from and form.date_to and form.date_from > form.date_to:
+        raise BizException(code=400, message="开始日期不能晚于结束日期")
+
+    async def _load() -> str:
+        rows = (await db.execute(build_daily_stats(
+            db.bind.dialect.name, userid, form.granularity, form.date_from, form.date_to, form.type
+        ))).all()
+        result = TransactionStatsResult(
+            granularity=form.granularity,
+            items=fill_stats_buckets(rows, form.granularity, form.date_from, form.date_to),
+        )
+        return R[TransactionStatsResult](data=result).model_dump_json()
+
+    # 按 (粒度, 区间, 类型) 缓存渲染好的响应，用户有任何写操作时版本号递增整体失效
+    variant = f"{form.granularity.value}:{form.date_from}:{form.date_to}:{form.type.value if form.type else ''}"
+    content = await stats_cache.get_or_load(redis_client, userid, _load, variant=variant)
+    return Response(content=content, media_type="application/json")
+
+
 @router.get("/getRecordDetail", response_model=R[TransactionResponse], description="获取交易记录详情")
 async def get_transaction_detail(
     transaction_id: str, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis_client = Depends(get_redis_client)
 ):
-    cache_key = f"transaction:{transaction_id}"
-    
-    # 从Redis缓存中获取交易记录
-    cached_transaction = await redis_client.get(cache_key)
-    if cached_transaction:
-        try:
-            transaction_data = json.loads(cached_transaction)
-            print('从缓存中获取交易记录:', transaction_data)
-            return R.ok(data=TransactionResponse.model_validate(transaction_data))
-        except (json.JSONDecodeError, ValueError) as e:
-            pass
-
-    transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
-    if transaction is None:
+    async def _load() -> Optional[str]:
+        # 交易、有效附件、创建人用户名一次查询取回
+        row = (await db.execute(build_transaction_detail(transaction_id, db.bind.dialect.name))).one_or_none()
+        if row is None:
+            return None
+
+        # 直接缓存完整的响应信封，命中时无需再校验/序列化
+        transaction = TransactionResponse.model_validate(transaction_detail_from_row(row))
+        return R[TransactionResponse](data=transaction).model_dump_json()
+
+    # 读穿透缓存：先查进程内 L1，再查 Redis，未命中时只有一个请求回源
+    # 缓存内容即最终响应体（JSON bytes），原样返回，跳过 response_model 的校验与重新编码
+    content = await transaction_cache.get_or_load(redis_client, transaction_id, _load)
+    if content is None:
         raise BizException(message="交易记录不存在")
 
-    # 获取关联的文件资产
-    fileassets = db.query(Fileassets).filter(Fileassets.business_id == transaction.transaction_id, Fileassets.status == FileStatus.ACTIVE).all()
-    transaction.filelist = [{"filepath": fa.filepath, "fileid": fa.fileid, "photo_id": fa.category} for fa in fileassets]
-
-    create_username = db.query(User.username).filter(User.userid == transaction.create_userid).first()
-    transaction.create_username = create_username[0] if create_username else ""
+    return Response(content=content, media_type="application/json")
 
-    # 将SQLAlchemy模型转换为Pydantic模型
-    transaction_response = TransactionResponse.model_validate(transaction)
-    
-    try:
-        await redis_client.set(cache_key, transaction_response.model_dump_json(), ex=1440)
-    except Exception as e:
-        pass
-    
-    return R.ok(data=transaction_response)
-
-def get_tx_delete_before_data(
+async def get_tx_delete_before_data(
     request: Request,
     transaction_id: str,
-    db: Session,
+    db: AsyncSession,
     **kwargs,
 ):
     """
     删除前，把被删记录的关键信息保留下来
     """
-    tx = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
+    tx = await db.scalar(select(Transaction).where(*build_transaction_lookup(transaction_id, db.bind.dialect.name)))
     if not tx:
         return None
     return {
         "transaction_id": tx.transaction_id,
-        "amount": tx.amount,
+        "amount": str(tx.amount),
         "type": tx.type,
         "remark": tx.remark,
         "create_userid": tx.create_userid,
     }
 
 
+async def _delete_with_rollups(db: AsyncSession, transaction_id: str) -> bool:
+    """
+    先删除再按实际删除的行扣减汇总与日汇总：并发删除同一条记录时只有真正删掉它的一方会扣减
+    返回是否删除了记录，由调用方提交或回滚
+    """
+    dialect_name = db.bind.dialect.name
+    rows = (await db.execute(build_transaction_delete(transaction_id, dialect_name))).all()
+    if len(rows) != 1:
+        return False
+    row = rows[0]
+    await db.execute(build_summary_upsert(
+        dialect_name,
+        row.create_userid,
+        *summary_delta(row.type, row.amount, sign=-1),
+    ))
+    await db.execute(build_daily_upsert(
+        dialect_name,
+        daily_delta_rows(row.create_userid, [(row.created_at, row.type, row.amount, -1)]),
+    ))
+    return True
+
+
 @router.post("/deleteRecord", response_model=R, description="删除交易记录", dependencies=[Depends(require_code("bill:delete"))])
 @audit_transaction(
     "删除交易记录",
@@ -245,17 +449,13 @@ async def delete_transaction(
     request: Request,
     transaction_id: str = Body(..., embed=True),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis_client = Depends(get_redis_client)
 ):
     if not transaction_id:
         raise BizException(message="交易记录ID不能为空")
 
-    cache_key = f"transaction:{transaction_id}"
-    # 从Redis缓存中删除交易记录
-    await redis_client.delete(cache_key)
-    
-    transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
+    transaction = await db.scalar(build_transaction_locked(transaction_id, db.bind.dialect.name))
     if transaction is None:
         raise BizException(message="交易记录不存在")
 
@@ -263,15 +463,23 @@ async def delete_transaction(
         raise BizException(message="您没有权限删除此交易记录")
 
     # 获取关联的文件资产路径
-    fileassets = db.query(Fileassets).filter(Fileassets.business_id == transaction.transaction_id).all()
+    fileassets = (await db.scalars(select(Fileassets).where(Fileassets.business_id == transaction.transaction_id))).all()
     
     try:
-        db.query(Fileassets).filter(Fileassets.business_id == transaction.transaction_id).delete()
-        db.delete(transaction)
-        db.commit()
+        await db.execute(delete(Fileassets).where(Fileassets.business_id == transaction.transaction_id))
+        deleted = await _delete_with_rollups(db, transaction_id)
+        if deleted:
+            await db.commit()
+        else:
+            await db.rollback()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise BizException(message=f"删除失败: {str(e)}")
+    if not deleted:
+        raise BizException(message="交易记录不存在")
+
+    await transaction_cache.bump(redis_client, transaction_id)
+    await stats_cache.bump(redis_client, current_user.userid)
     
     # 尝试删除实际文件（在事务提交后执行，避免事务失败）
     for fileasset in fileassets:
@@ -301,10 +509,78 @@ async def delete_transaction(
 
 @router.get("/exportTransactionsByUser", response_model=R, description="导出用户交易记录", dependencies=[Depends(RateLimiter(times=5, seconds=60))])
 async def export_transactions_by_user(
-    user_id: str
+    user_id: str,
+    fmt: ExportFormat = Query(ExportFormat.XLSX, description="导出格式：xlsx/csv/ndjson/parquet/feather"),
+    since: Optional[datetime] = Query(None, description="增量导出：只导出该时间之后有变更的记录，取上次导出结果中的 watermark；会向前重叠一段时间，需按 transaction_id 去重"),
+    db: AsyncSession = Depends(get_async_db),
+    redis_client = Depends(get_redis_client),
+):
+    # 数据未变化时复用已有文件，并发的相同请求合并到同一个任务
+    summary = await db.get(UserTransactionSummary, user_id)
+    data = await dispatch_export(redis_client, user_id, fmt, export_watermark(summary), since=since)
+    message = "导出文件已就绪" if data["task_status"] == "SUCCESS" else "导出任务已启动"
+    return R.ok(data=data, message=message)
+
+
+_STREAM_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _stream_export(userid: str, fmt: ExportFormat):
+    # 响应开始前请求级的 db 依赖已释放，流式期间自行持有同步 Session（StreamingResponse 在线程池中迭代）
+    db = SessionLocal()
+    try:
+        if fmt == ExportFormat.CSV:
+            # BOM 让 Excel 直接打开时不乱码
+            yield "\ufeff" + encode_csv((), header=True)
+        for batch in iter_export_batches(db, userid):
+            yield encode_csv(batch) if fmt == ExportFormat.CSV else encode_ndjson(batch)
+    finally:
+        db.close()
+
+
+@router.get("/exportTransactions", description="导出当前用户交易记录：数据量小时直接流式返回，否则转为后台任务", dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+async def export_transactions(
+    fmt: ExportFormat = Query(ExportFormat.CSV, description="导出格式：csv/ndjson 可直接流式返回，xlsx/parquet/feather 始终走后台任务"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    redis_client = Depends(get_redis_client),
+):
+    # 汇总表按主键取总笔数，决定直接流式返回还是走 Celery
+    summary = await db.get(UserTransactionSummary, current_user.userid)
+    total = summary.total_transactions if summary else 0
+
+    if fmt not in _STREAM_MEDIA_TYPES or total > settings.EXPORT_INLINE_MAX_ROWS:
+        data = await dispatch_export(redis_client, current_user.userid, fmt, export_watermark(summary))
+        message = "导出文件已就绪" if data["task_status"] == "SUCCESS" else "导出任务已启动"
+        return R.ok(data=data, message=message)
+
+    return StreamingResponse(
+        _stream_export(current_user.userid, fmt),
+        media_type=_STREAM_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{fmt.value}"'},
+    )
+
+
+@router.post("/exportAllTransactions", response_model=R, description="管理端全量导出：按用户分片并行导出后合并", dependencies=[Depends(require_code("bill:export_all")), Depends(RateLimiter(times=2, seconds=60))])
+async def export_all_transactions(
+    fmt: ExportFormat = Query(ExportFormat.CSV, description="导出格式：csv/ndjson 合并为单个文件，xlsx/parquet/feather 打包为 zip"),
+    shards: Optional[int] = Query(None, ge=1, le=64, description="分片数，默认取配置 EXPORT_SHARD_COUNT"),
+    db: AsyncSession = Depends(get_async_db),
+    redis_client = Depends(get_redis_client),
+):
+    data = await dispatch_sharded_export(redis_client, db, fmt, shards)
+    return R.ok(data=data, message="导出任务已启动")
+
+
+@router.get("/getExportAllStatus", response_model=R, description="获取管理端全量导出进度", dependencies=[Depends(require_code("bill:export_all"))])
+async def get_export_all_status(
+    job_id: str,
+    redis_client = Depends(get_redis_client),
 ):
-    task = export_transactions_by_user_task.delay(user_id)
-    return R.ok(data={"task_id": task.id}, message="导出任务已启动")
+    return R.ok(data=await sharded_export_status(redis_client, job_id))
 
 
 @router.get("/getExportTaskStatus", response_model=R, description="获取导出任务状态")
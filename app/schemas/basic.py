@@ -1,9 +1,18 @@
-from typing import Generic, List, Optional, TypeVar
+from decimal import Decimal
+from typing import Annotated, Generic, List, Optional, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PlainSerializer
 
 T = TypeVar("T")
 
+# 金额：内部以 Decimal 精确计算，最多两位小数；JSON 中仍以数字输出，保持接口兼容
+# （两位小数、18 位以内的金额转 float 后的最短表示与原值一致）
+Money = Annotated[
+    Decimal,
+    Field(max_digits=18, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
 class PageParams(BaseModel):
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=200)
@@ -16,3 +25,15 @@ class PageResult(BaseModel, Generic[T]):
     total: int
     items: List[T]
     extras: Optional[dict] = None
+
+class CursorParams(BaseModel):
+    # 游标（keyset）分页：翻页耗时与页深无关，新增数据也不会导致翻页漂移
+    cursor: Optional[str] = Field(None, description="上一页返回的 next_cursor，为空表示第一页")
+    page_size: int = Field(20, ge=1, le=200)
+
+class CursorPageResult(BaseModel, Generic[T]):
+    page_size: int
+    items: List[T]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    extras: Optional[dict] = None
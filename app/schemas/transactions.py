@@ -1,11 +1,13 @@
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
 from pydantic.config import ConfigDict
 
-from app.domains.enums import TransactionType
-from app.schemas.basic import PageParams
+from app.core.config import settings
+from app.domains.enums import CountMode, StatsGranularity, TransactionType
+from app.schemas.basic import CursorParams, Money, PageParams
 
 class FileInfo(BaseModel):
     filepath: str
@@ -14,7 +16,7 @@ class FileInfo(BaseModel):
 
 
 class TransactionCreate(BaseModel):
-    amount: float = Field(default=0, gt=0, description="交易金额必须大于0")
+    amount: Money = Field(default=Decimal("0"), gt=0, description="交易金额必须大于0，最多两位小数")
     type: TransactionType = Field(default=TransactionType.INCOME, description="交易类型必须是枚举值")
     remark: Optional[str] = Field(default="", max_length=255, description="交易备注最大长度为255")
     filelist: Optional[List[FileInfo]] = Field(default_factory=[], description="交易文件列表")
@@ -23,13 +25,17 @@ class TransactionCreate(BaseModel):
     delFileids: Optional[str] = Field(None, description="要删除的文件ID拼接，多个ID用英文逗号分隔")
 
 
+class TransactionBatchCreate(BaseModel):
+    items: List[TransactionCreate] = Field(..., min_length=1, max_length=settings.BATCH_CREATE_MAX_ITEMS, description="待新增的交易记录列表")
+
+
 class TransactionResponse(BaseModel):
     transaction_id: str
     create_userid: str
     create_username: Optional[str] = None
     update_userid: Optional[str] = None
     update_username: Optional[str] = None
-    amount: float
+    amount: Money
     type: TransactionType
     remark: Optional[str] = None
     filelist: Optional[List[FileInfo]] = None
@@ -39,11 +45,39 @@ class TransactionResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class TransactionListQuery(PageParams):
+class TransactionFilter(BaseModel):
     date_from: Optional[datetime] = Field(None, description="开始时间（含）")
     date_to: Optional[datetime] = Field(None, description="结束时间（含）")
     type: Optional[TransactionType] = None
-    min_amount: Optional[float] = Field(None, ge=0)
-    max_amount: Optional[float] = Field(None, ge=0)
+    min_amount: Optional[Money] = Field(None, ge=0)
+    max_amount: Optional[Money] = Field(None, ge=0)
     keyword: Optional[str] = Field(None, description="搜索备注/类型（模糊查询）")
-    userid: Optional[str] = Field(None, description="用户ID")
\ No newline at end of file
+    userid: Optional[str] = Field(None, description="用户ID")
+
+
+class TransactionListQuery(TransactionFilter, PageParams):
+    count_mode: CountMode = Field(CountMode.WINDOW, description="总数统计方式：EXACT/WINDOW/ESTIMATE")
+    snapshot: Optional[str] = Field(None, description="快照令牌：第一页 extras.snapshot 返回，后续翻页原样带回，保证翻页期间结果集稳定")
+
+
+class TransactionCursorQuery(TransactionFilter, CursorParams):
+    pass
+
+
+class TransactionStatsQuery(BaseModel):
+    granularity: StatsGranularity = Field(StatsGranularity.DAY, description="统计粒度：day/week/month")
+    date_from: Optional[date] = Field(None, description="开始日期（含）")
+    date_to: Optional[date] = Field(None, description="结束日期（含）")
+    type: Optional[TransactionType] = None
+
+
+class StatsBucket(BaseModel):
+    period: date = Field(..., description="时间桶起始日期")
+    income: Money = Decimal("0")
+    expense: Money = Decimal("0")
+    count: int = 0
+
+
+class TransactionStatsResult(BaseModel):
+    granularity: StatsGranularity
+    items: List[StatsBucket]
@@ -1,6 +1,18 @@
 """任务模块初始化文件"""
 
 # 导入任务，确保Celery能发现它们
-from app.tasks.celery_tasks import cleanup_files_task, export_transactions_by_user_task
+from app.tasks.celery_tasks import (
+    cleanup_files_task,
+    export_transactions_by_user_task,
+    export_transactions_shard_task,
+    maintain_partitions_task,
+    merge_export_shards_task,
+)
 
-__all__ = ['cleanup_files_task', 'export_transactions_by_user_task']
+__all__ = [
+    'cleanup_files_task',
+    'export_transactions_by_user_task',
+    'export_transactions_shard_task',
+    'maintain_partitions_task',
+    'merge_export_shards_task',
+]
\ No newline at end of file
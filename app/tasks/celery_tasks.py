@@ -1,7 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from app.core.cache import stats_cache
 from app.core.celery_config import celery_app
-from app.db.db_session import SessionLocal
+from app.core.config import settings
+from app.db.db_session import SessionLocal, engine
+from app.db.partitions import detach_expired_partitions, ensure_partitions
+from app.db.redis_session import get_sync_redis_client
 from app.tasks.cleanup import cleanup_files as cleanup_files_func
-from app.tasks.export_reporter import export_transactions_by_user_func
+from app.tasks.export_reporter import (
+    export_job_key,
+    export_shard_func,
+    export_transactions_by_user_func,
+    merge_export_shards_func,
+)
 
 @celery_app.task(bind=True, name='app.tasks.celery_tasks.cleanup_files_task')
 def cleanup_files_task(self, dry_run: bool = True):
@@ -18,16 +30,86 @@ def cleanup_files_task(self, dry_run: bool = True):
         db.close()
 
 
+@celery_app.task(bind=True, name='app.tasks.celery_tasks.maintain_partitions_task')
+def maintain_partitions_task(self):
+    # 分区只在 PostgreSQL 上存在
+    if engine.dialect.name != "postgresql":
+        return {"created": [], "detached": []}
+    try:
+        with engine.begin() as conn:
+            created = ensure_partitions(conn, settings.PARTITION_MONTHS_AHEAD)
+        with engine.begin() as conn:
+            archived = detach_expired_partitions(
+                conn,
+                settings.PARTITION_RETENTION_MONTHS,
+                settings.PARTITION_ARCHIVE_SCHEMA,
+                settings.STATS_TIMEZONE,
+            )
+        if archived["users"]:
+            # 汇总已扣除归档数据，统计缓存按用户版本号整体失效
+            r = get_sync_redis_client()
+            p = r.pipeline()
+            for uid in archived["users"]:
+                p.incr(stats_cache.version_key(uid))
+                p.expire(stats_cache.version_key(uid), stats_cache.version_ttl)
+            p.execute()
+        return {"created": created, "detached": archived["detached"], "users": len(archived["users"])}
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+
+
 @celery_app.task(bind=True,name='app.tasks.celery_tasks.export_transactions_by_user_task')
-def export_transactions_by_user_task(self, user_id: str):
+def export_transactions_by_user_task(self, user_id: str, fmt: str = "xlsx", since: Optional[str] = None, tag: Optional[str] = None):
     db = SessionLocal()
     try:
         self.update_state(state='PROGRESS', meta={'progress': 0})
-        result = export_transactions_by_user_func(db, user_id=user_id)
+
+        def report(done: int, total: int):
+            self.update_state(state='PROGRESS', meta={'progress': done * 100 // total, 'rows': done})
+
+        result = export_transactions_by_user_func(
+            db,
+            user_id=user_id,
+            fmt=fmt,
+            progress=report,
+            since=datetime.fromisoformat(since) if since else None,
+            tag=tag,
+        )
         self.update_state(state='PROGRESS', meta={'progress': 100})
         return result
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery_app.task(bind=True, name='app.tasks.celery_tasks.export_transactions_shard_task')
+def export_transactions_shard_task(self, job_id: str, index: int, user_ids: list, fmt: str = "csv"):
+    db = SessionLocal()
+    redis_client = get_sync_redis_client()
+    job_key = export_job_key(job_id)
+    try:
+        # 各分片把已写入行数累加到同一个 hash，汇总进度由接口读取
+        def report(rows: int):
+            redis_client.hincrby(job_key, "rows", rows)
+
+        result = export_shard_func(db, job_id, index, user_ids, fmt, progress=report)
+        redis_client.hincrby(job_key, "shards_done", 1)
+        return result
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, name='app.tasks.celery_tasks.merge_export_shards_task')
+def merge_export_shards_task(self, shard_results: list, job_id: str, fmt: str = "csv"):
+    try:
+        self.update_state(state='PROGRESS', meta={'progress': 100, 'stage': 'merge'})
+        return merge_export_shards_func(job_id, fmt, shard_results)
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
@@ -1,35 +1,414 @@
+import csv
+from datetime import datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from functools import partial
+import glob
+import heapq
+import io
+import json
+import os
+import shutil
+import time
+import zipfile
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook
+from sqlalchemy import DateTime, Enum as SqlEnum, Float, Numeric, func, select
+
+from app.core.config import settings
 from app.core.exceptions import BizException
-from app.db.models import Transaction
-import pandas as pd
+from app.db.models import Transaction, UserTransactionSummary
+from app.db.transaction_repo import TRANSACTION_ORDER_BY
+from app.domains.enums import ExportFormat
+
+# Excel 单个工作表最多 1048576 行（含表头），超过后续写到新的工作表
+XLSX_MAX_ROWS = 1048576
+
+# 进度回调：(已写入行数, 预计总行数)
+ProgressCallback = Callable[[int, int], None]
+
+EXPORT_HEADER: List[str] = [c.name for c in Transaction.__table__.columns]
+
+
+def _cell(v):
+    # 与旧版保持一致：时间转 ISO 字符串，枚举取值
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, Enum):
+        return v.value
+    return v
+
+
+def _enum_value(v):
+    return v.value if isinstance(v, Enum) else v
+
+
+def iter_export_batches(
+    db,
+    user_id: str,
+    batch_size: Optional[int] = None,
+    convert: Callable = _cell,
+    since: Optional[datetime] = None,
+) -> Iterator[List[tuple]]:
+    """
+    服务端游标按批取出用户的交易记录，每批为经 convert 转换后的行元组列表
+    since：只取变更时间（updated_at，没有则 created_at）晚于该时间的记录；删除不会出现在增量中
+    since 会向前重叠 EXPORT_SINCE_OVERLAP_SECONDS 秒，相邻两次增量可能包含同一条记录，下游按 transaction_id 去重
+    """
+    table = Transaction.__table__
+    conds = [table.c.create_userid == user_id]
+    if since is not None:
+        cutoff = since - timedelta(seconds=settings.EXPORT_SINCE_OVERLAP_SECONDS)
+        conds.append(_changed_at(table) > cutoff)
+    yield from _iter_batches(db, conds, TRANSACTION_ORDER_BY, batch_size, convert)
+
+
+def _changed_at(table):
+    return func.coalesce(table.c.updated_at, table.c.created_at)
+
+
+def export_since_watermark(db, user_id: str) -> Optional[datetime]:
+    """
+    下一次增量导出的 since：取用户明细自身的最大变更时间，与 iter_export_batches 过滤用的是同一列、同一时钟
+    需在取数之前查询，取数期间提交的写入留给下一次增量
+    """
+    table = Transaction.__table__
+    return db.scalar(select(func.max(_changed_at(table))).where(table.c.create_userid == user_id))
+
+
+def _iter_batches(db, conds: list, order_by, batch_size: Optional[int], convert: Callable) -> Iterator[List[tuple]]:
+    table = Transaction.__table__
+    stmt = (
+        select(table)
+        .where(*conds)
+        .order_by(*order_by)
+        .execution_options(yield_per=batch_size or settings.EXPORT_BATCH_SIZE)
+    )
+    for partition in db.execute(stmt).partitions():
+        yield [tuple(convert(v) for v in row) for row in partition]
+
+
+def encode_csv(rows: Iterable[tuple], header: bool = False) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(EXPORT_HEADER)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def _json_default(v):
+    # 金额按数字输出，与接口中的 Money 字段一致
+    if isinstance(v, Decimal):
+        return float(v)
+    return str(v)
+
+
+def encode_ndjson(rows: Iterable[tuple]) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_HEADER, row)), ensure_ascii=False, default=_json_default) + "\n"
+        for row in rows
+    )
+
+
+def _write_csv(path: str, batches: Iterable[List[tuple]]) -> int:
+    written = 0
+    # utf-8-sig 让 Excel 直接打开时不乱码
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        f.write(encode_csv((), header=True))
+        for batch in batches:
+            f.write(encode_csv(batch))
+            written += len(batch)
+    return written
+
+
+def _write_ndjson(path: str, batches: Iterable[List[tuple]]) -> int:
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for batch in batches:
+            f.write(encode_ndjson(batch))
+            written += len(batch)
+    return written
+
+
+def _write_xlsx(path: str, batches: Iterable[List[tuple]]) -> int:
+    # write_only 模式逐行落盘，不在内存中保留单元格对象
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = XLSX_MAX_ROWS
+    written = 0
+    for batch in batches:
+        for row in batch:
+            if sheet_rows >= XLSX_MAX_ROWS:
+                ws = wb.create_sheet(title=f"transactions_{len(wb.worksheets) + 1}")
+                ws.append(EXPORT_HEADER)
+                sheet_rows = 1
+            ws.append(row)
+            sheet_rows += 1
+        written += len(batch)
+    if ws is None:
+        wb.create_sheet(title="transactions_1").append(EXPORT_HEADER)
+    wb.save(path)
+    return written
+
+
+def _arrow_schema(pa):
+    """按表结构生成带类型的 Arrow schema：枚举字典编码，时间保留时区"""
+    fields = []
+    for col in Transaction.__table__.columns:
+        if isinstance(col.type, SqlEnum):
+            typ = pa.dictionary(pa.int32(), pa.string())
+        elif isinstance(col.type, Float):
+            typ = pa.float64()
+        elif isinstance(col.type, Numeric):
+            typ = pa.decimal128(col.type.precision, col.type.scale)
+        elif isinstance(col.type, DateTime):
+            typ = pa.timestamp("us", tz="UTC" if col.type.timezone else None)
+        else:
+            typ = pa.string()
+        fields.append(pa.field(col.name, typ, nullable=col.nullable))
+    return pa.schema(fields)
+
 
-def export_transactions_by_user_func(db, user_id: str):
-    # 导出excel文件
+def _write_arrow(path: str, batches: Iterable[List[tuple]], fmt: ExportFormat) -> int:
+    # pyarrow 体积较大，只在导出列式格式时才加载
     try:
-        # 查询用户交易记录
-        rows = db.query(Transaction).filter(Transaction.create_userid == user_id).all()
-        if not rows:
-            raise BizException(code=500, message="该用户暂无交易记录")
-
-        # 清洗模型 -> dict（去掉 SQLAlchemy 内部字段）
-        def to_row(t):
-            d = {k: v for k, v in t.__dict__.items() if not k.startswith("_sa_")}
-            # 可选：把 datetime 转成字符串，避免部分引擎写入时出问题
-            for k, v in list(d.items()):
-                if hasattr(v, "isoformat"):
-                    d[k] = v.isoformat()
-            return d
-
-        df = pd.DataFrame([to_row(t) for t in rows])
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise BizException(code=500, message="导出 Parquet/Feather 需要安装 pyarrow")
+
+    schema = _arrow_schema(pa)
+    # Arrow IPC 文件格式不允许批次之间替换字典，枚举列统一按列定义的全部取值编码
+    dictionaries = {}
+    for col in Transaction.__table__.columns:
+        if isinstance(col.type, SqlEnum):
+            members = [e.value for e in col.type.enum_class] if col.type.enum_class else list(col.type.enums)
+            dictionaries[col.name] = (pa.array(members, type=pa.string()), {v: i for i, v in enumerate(members)})
+
+    def to_record_batch(rows: List[tuple]):
+        arrays = []
+        for field, values in zip(schema, zip(*rows)):
+            if pa.types.is_dictionary(field.type):
+                dictionary, index = dictionaries[field.name]
+                indices = pa.array([None if v is None else index[v] for v in values], type=pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    written = 0
+    if fmt == ExportFormat.PARQUET:
+        # 攒够一个 row group 再写，避免每个数据库批次都产生一个很小的 row group
+        row_group_size = settings.EXPORT_PARQUET_ROW_GROUP_SIZE
+        pending, pending_rows = [], 0
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for batch in batches:
+                if not batch:
+                    continue
+                pending.append(to_record_batch(batch))
+                pending_rows += len(batch)
+                written += len(batch)
+                if pending_rows >= row_group_size:
+                    writer.write_table(pa.Table.from_batches(pending), row_group_size=row_group_size)
+                    pending, pending_rows = [], 0
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=row_group_size)
+    else:
+        # Feather v2 即 Arrow IPC 文件格式，按批追加
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in batches:
+                if batch:
+                    writer.write_batch(to_record_batch(batch))
+                    written += len(batch)
+    return written
+
+
+_WRITERS = {
+    ExportFormat.XLSX: _write_xlsx,
+    ExportFormat.CSV: _write_csv,
+    ExportFormat.NDJSON: _write_ndjson,
+    ExportFormat.PARQUET: partial(_write_arrow, fmt=ExportFormat.PARQUET),
+    ExportFormat.FEATHER: partial(_write_arrow, fmt=ExportFormat.FEATHER),
+}
+
+# 列式格式保留原始类型（时间、数值），只把枚举转成字符串
+_COLUMNAR = {ExportFormat.PARQUET, ExportFormat.FEATHER}
+
+
+def _prune_artifacts(export_dir: str, ext: str, keep: str) -> None:
+    """删除同格式下超过保留期的旧导出文件"""
+    deadline = time.time() - settings.EXPORT_ARTIFACT_TTL
+    for path in glob.glob(os.path.join(export_dir, f"transactions*.{ext}")):
+        try:
+            if path != keep and os.path.getmtime(path) < deadline:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def export_transactions_by_user_func(
+    db,
+    user_id: str,
+    fmt: ExportFormat = ExportFormat.XLSX,
+    progress: Optional[ProgressCallback] = None,
+    batch_size: Optional[int] = None,
+    since: Optional[datetime] = None,
+    tag: Optional[str] = None,
+):
+    # 流式导出：服务端游标按批取数，边取边写文件，内存占用与总行数无关
+    try:
+        fmt = ExportFormat(fmt)
+
+        # 总行数直接取汇总表，仅用于进度展示
+        summary = db.get(UserTransactionSummary, user_id)
+        total = summary.total_transactions if summary else 0
+        # 下一次增量导出的 since 取自明细行的变更时间，而不是汇总表的 updated_at（数据库事务开始时间）
+        last_changed = export_since_watermark(db, user_id)
+        watermark = last_changed.isoformat() if last_changed else (since.isoformat() if since else None)
+
+        def batches():
+            done = 0
+            convert = _enum_value if fmt in _COLUMNAR else _cell
+            for batch in iter_export_batches(db, user_id, batch_size, convert=convert, since=since):
+                yield batch
+                done += len(batch)
+                if progress:
+                    progress(done, max(total, done))
 
         # 建议把文件落到静态目录，便于前端下载
-        import os
         export_dir = os.path.join("static", "exports", str(user_id))
         os.makedirs(export_dir, exist_ok=True)
-        out_path = os.path.join(export_dir, "transactions.xlsx")
-        df.to_excel(out_path, index=False)  # 需要安装 openpyxl
+        # 带水位标记的文件名：不同版本的数据互不覆盖
+        name_parts = ["transactions"]
+        if since is not None:
+            name_parts.append(f"since{int(since.timestamp())}")
+        if tag:
+            name_parts.append(tag)
+        filename = f"{'_'.join(name_parts)}.{fmt.value}"
+        out_path = os.path.join(export_dir, filename)
+        # 先写临时文件再原子替换，避免下载到写了一半的文件
+        tmp_path = f"{out_path}.part"
+        try:
+            written = _WRITERS[fmt](tmp_path, batches())
+            # 增量导出没有变更时返回只有表头的空文件
+            if not written and since is None:
+                raise BizException(code=500, message="该用户暂无交易记录")
+            os.replace(tmp_path, out_path)
+            _prune_artifacts(export_dir, fmt.value, keep=out_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
         # 返回“可下载”的 URL（而不是相对工作目录的文件名）
-        download_url = f"/static/exports/{user_id}/transactions.xlsx"
-        return {"path": out_path, "url": download_url}
+        download_url = f"/static/exports/{user_id}/{filename}"
+        return {"path": out_path, "url": download_url, "rows": written, "watermark": watermark}
     except Exception as e:
-        raise BizException(code=500, message=str(e))
\ No newline at end of file
+        raise BizException(code=500, message=str(e))
+
+
+# ====== 管理端全量分片导出 ======
+
+def plan_user_shards(user_totals: Iterable[Tuple[str, int]], shard_count: int) -> List[List[str]]:
+    """
+    按用户切分导出分片：每个用户整体落在一个分片内（查询可走 create_userid 索引），
+    按汇总表中的笔数从大到小贪心分配到当前最轻的分片，使各分片行数尽量均衡
+    """
+    ordered = sorted((t for t in user_totals if t[1] > 0), key=lambda t: t[1], reverse=True)
+    shard_count = max(1, min(shard_count, len(ordered)))
+    heap = [(0, i) for i in range(shard_count)]
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    for userid, total in ordered:
+        load, i = heapq.heappop(heap)
+        shards[i].append(userid)
+        heapq.heappush(heap, (load + total, i))
+    return [s for s in shards if s]
+
+
+def export_job_key(job_id: str) -> str:
+    """分片导出任务的进度 hash：total / rows / shards / shards_done / task_id"""
+    return f"export_job:{job_id}"
+
+
+def admin_export_dir(job_id: str) -> str:
+    return os.path.join("static", "exports", "admin", job_id)
+
+
+def export_shard_func(
+    db,
+    job_id: str,
+    index: int,
+    user_ids: List[str],
+    fmt: ExportFormat,
+    progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """导出一个分片到 admin/{job_id}/part-xxxx.{fmt}，progress 收到每批新增的行数"""
+    fmt = ExportFormat(fmt)
+    export_dir = admin_export_dir(job_id)
+    os.makedirs(export_dir, exist_ok=True)
+    out_path = os.path.join(export_dir, f"part-{index:04d}.{fmt.value}")
+
+    table = Transaction.__table__
+    convert = _enum_value if fmt in _COLUMNAR else _cell
+
+    def batches():
+        for batch in _iter_batches(
+            db,
+            [table.c.create_userid.in_(user_ids)],
+            (table.c.create_userid, *TRANSACTION_ORDER_BY),
+            None,
+            convert,
+        ):
+            yield batch
+            if progress:
+                progress(len(batch))
+
+    tmp_path = f"{out_path}.part"
+    try:
+        written = _WRITERS[fmt](tmp_path, batches())
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"index": index, "path": out_path, "rows": written}
+
+
+def merge_export_shards_func(job_id: str, fmt: ExportFormat, shard_results: List[dict]) -> dict:
+    """
+    合并分片：csv/ndjson 直接按顺序拼接（csv 只保留第一个分片的表头），
+    xlsx/parquet/feather 本身已压缩且不便拼接，打包为 zip
+    """
+    fmt = ExportFormat(fmt)
+    export_dir = admin_export_dir(job_id)
+    parts = [r["path"] for r in sorted(shard_results, key=lambda r: r["index"])]
+
+    if fmt in (ExportFormat.CSV, ExportFormat.NDJSON):
+        filename = f"transactions.{fmt.value}"
+        out_path = os.path.join(export_dir, filename)
+        with open(out_path, "wb") as out:
+            for i, part in enumerate(parts):
+                with open(part, "rb") as f:
+                    if fmt == ExportFormat.CSV and i > 0:
+                        f.readline()  # 跳过 BOM + 表头
+                    shutil.copyfileobj(f, out)
+    else:
+        filename = f"transactions_{fmt.value}.zip"
+        out_path = os.path.join(export_dir, filename)
+        with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for part in parts:
+                zf.write(part, arcname=os.path.basename(part))
+
+    for part in parts:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+
+    return {
+        "path": out_path,
+        "url": f"/static/exports/admin/{job_id}/{filename}",
+        "rows": sum(r["rows"] for r in shard_results),
+        "shards": len(parts),
+    }
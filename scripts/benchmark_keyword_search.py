@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+getRecords 关键字搜索基准测试（PostgreSQL）
+
+对比同一条关键字查询在以下两种执行方式下的耗时：
+- seqscan：关闭 bitmap/index 扫描，等价于没有 trgm 索引时的顺序扫描
+- trgm：允许规划器使用 ix_transactions_remark_trgm（GIN, gin_trgm_ops）
+
+使用方法：
+1. 先执行 alembic upgrade head，确保 pg_trgm 扩展与索引已创建
+2. python scripts/benchmark_keyword_search.py --rows 1000000
+   首次运行会为基准用户灌入 --rows 条数据，再次运行复用已有数据
+3. python scripts/benchmark_keyword_search.py --cleanup  删除基准数据
+
+注意：基准数据直接写入明细表，不维护 user_transaction_totals，请勿在生产库运行
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import func, select, text
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.security import hash_password
+from app.db.db_session import SessionLocal
+from app.db.models import Transaction, User
+from app.db.transaction_repo import TRANSACTION_ORDER_BY, build_transaction_filters
+
+BENCH_USERNAME = "__bench_keyword__"
+KEYWORDS = ["午餐", "打车", "房租", "a3f", "not-exist-kw"]
+
+SEED_SQL = text("""
+    INSERT INTO transactions (transaction_id, create_userid, amount, type, remark, created_at)
+    SELECT
+        md5(random()::text || g::text),
+        :uid,
+        round((random() * 1000)::numeric, 2),
+        (CASE WHEN random() < 0.5 THEN 'INCOME' ELSE 'EXPENSE' END)::transactiontype,
+        (ARRAY['午餐','工资','打车','房租','咖啡','超市','话费','理财'])[1 + floor(random() * 8)::int]
+            || ' ' || substr(md5(g::text), 1, 12),
+        now() - (g || ' seconds')::interval
+    FROM generate_series(1, :n) AS g
+""")
+
+
+def _ensure_bench_user(db) -> str:
+    user = db.query(User).filter(User.username == BENCH_USERNAME).first()
+    if not user:
+        user = User(username=BENCH_USERNAME, password_hash=hash_password("Bench#2025"))
+        db.add(user)
+        db.commit()
+    return user.userid
+
+
+def _seed(db, userid: str, rows: int) -> None:
+    existing = db.scalar(select(func.count()).select_from(Transaction).where(Transaction.create_userid == userid))
+    if existing >= rows:
+        print(f"复用已有基准数据: {existing} 行")
+        return
+    print(f"灌入基准数据: {rows - existing} 行 ...")
+    t0 = time.perf_counter()
+    db.execute(SEED_SQL, {"uid": userid, "n": rows - existing})
+    db.commit()
+    db.execute(text("ANALYZE transactions"))
+    db.commit()
+    print(f"灌入完成，耗时 {time.perf_counter() - t0:.1f}s")
+
+
+def _run_once(db, userid: str, keyword: str, seqscan: bool) -> float:
+    form = SimpleNamespace(
+        date_from=None, date_to=None, type=None,
+        min_amount=None, max_amount=None, keyword=keyword,
+    )
+    stmt = (
+        select(Transaction.transaction_id)
+        .where(*build_transaction_filters(form, userid, "postgresql"))
+        .order_by(*TRANSACTION_ORDER_BY)
+        .limit(20)
+    )
+    with db.begin():
+        if seqscan:
+            db.execute(text("SET LOCAL enable_bitmapscan = off"))
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+        t0 = time.perf_counter()
+        db.execute(stmt).all()
+        return (time.perf_counter() - t0) * 1000
+
+
+def benchmark(rows: int, repeat: int) -> None:
+    db = SessionLocal()
+    try:
+        userid = _ensure_bench_user(db)
+        _seed(db, userid, rows)
+        db.commit()
+
+        print(f"\n{'keyword':<16}{'mode':<10}{'p50(ms)':>10}{'p95(ms)':>10}")
+        for kw in KEYWORDS:
+            for mode in ("seqscan", "trgm"):
+                timings = [_run_once(db, userid, kw, mode == "seqscan") for _ in range(repeat)]
+                timings.sort()
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                print(f"{kw:<16}{mode:<10}{statistics.median(timings):>10.2f}{p95:>10.2f}")
+    finally:
+        db.close()
+
+
+def cleanup() -> None:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == BENCH_USERNAME).first()
+        if user:
+            db.query(Transaction).filter(Transaction.create_userid == user.userid).delete()
+            db.delete(user)
+            db.commit()
+        print("基准数据已清理")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="getRecords 关键字搜索基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="基准用户的交易条数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个关键字的执行次数")
+    parser.add_argument("--cleanup", action="store_true", help="删除基准数据后退出")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+    else:
+        benchmark(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
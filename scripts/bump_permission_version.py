@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+递增权限索引版本号，通知各 worker 重新加载资源与授权
+
+直接在数据库中修改 resources / role_area_grants 后执行：
+python scripts/bump_permission_version.py
+"""
+
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.permissions import PERMISSION_VERSION_KEY
+from app.db.redis_session import get_sync_redis_client
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    version = get_sync_redis_client().incr(PERMISSION_VERSION_KEY)
+    logger.info(f"权限版本号已更新为 {version}")
+
+
+if __name__ == "__main__":
+    main()
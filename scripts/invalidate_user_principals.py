@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+使指定用户所有会话的登录快照（Principal）失效
+
+直接在数据库中修改用户资料、状态（禁用/冻结/删除）或用户角色后执行，
+否则在 PRINCIPAL_CACHE_TTL 内仍会沿用旧快照：
+python scripts/invalidate_user_principals.py <userid> [<userid> ...]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import logging
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.principal import invalidate_user_principals
+from app.db.redis_session import close_redis, get_redis_client, init_redis
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+
+async def invalidate(userids) -> None:
+    await init_redis()
+    try:
+        for uid in userids:
+            await invalidate_user_principals(get_redis_client(), uid)
+            logger.info(f"用户 {uid} 的登录快照已失效")
+    finally:
+        await close_redis()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="使指定用户所有会话的登录快照失效")
+    parser.add_argument("userids", nargs="+", help="用户ID")
+    args = parser.parse_args()
+    asyncio.run(invalidate(args.userids))
+
+
+if __name__ == "__main__":
+    main()
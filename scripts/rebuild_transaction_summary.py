@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+重建 / 校验用户交易汇总表（user_transaction_totals）的脚本
+
+使用方法：
+1. 校验：python scripts/rebuild_transaction_summary.py --verify
+   列出汇总表与明细聚合不一致的用户，存在差异时以非 0 退出码结束
+2. 重建：python scripts/rebuild_transaction_summary.py
+   在单个事务内清空并按明细重新聚合写入，PostgreSQL 上同时重建日汇总（user_transaction_daily）
+"""
+
+import argparse
+import os
+import sys
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db_session import SessionLocal
+from app.db.transaction_repo import build_daily_rebuild, build_summary_rebuild, build_summary_verify
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+
+def verify_summary() -> int:
+    """校验汇总表，返回不一致的用户数"""
+    db = SessionLocal()
+    try:
+        mismatches = db.execute(build_summary_verify()).all()
+        for row in mismatches:
+            logger.warning(
+                f"用户 {row.userid} 汇总不一致: "
+                f"笔数 {row.stored_transactions} -> {row.total_transactions}, "
+                f"收入 {row.stored_income} -> {row.total_income}, "
+                f"支出 {row.stored_expense} -> {row.total_expense}"
+            )
+        logger.info(f"校验完成，不一致用户数: {len(mismatches)}")
+        return len(mismatches)
+    finally:
+        db.close()
+
+
+def rebuild_summary() -> None:
+    """在一个事务内全量重建汇总表"""
+    db = SessionLocal()
+    try:
+        stmts = build_summary_rebuild()
+        if db.bind.dialect.name == "postgresql":
+            stmts += build_daily_rebuild()
+        for stmt in stmts:
+            db.execute(stmt)
+        db.commit()
+        logger.info("汇总表重建完成")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="重建/校验用户交易汇总表")
+    parser.add_argument("--verify", action="store_true", help="只校验，不修改数据")
+    args = parser.parse_args()
+
+    try:
+        if args.verify:
+            sys.exit(1 if verify_summary() else 0)
+        rebuild_summary()
+        verify_summary()
+    except SQLAlchemyError as e:
+        logger.error(f"数据库错误: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
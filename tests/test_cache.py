@@ -0,0 +1,96 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.core.cache import _MISSING, LocalTTLCache, ReadThroughCache
+
+
+def test_local_cache_lru_eviction():
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)
+    assert cache.get("b") is _MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_local_cache_ttl_expired():
+    cache = LocalTTLCache(maxsize=10, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is _MISSING
+    assert len(cache) == 0
+
+
+def test_local_cache_skips_stale_fill():
+    cache = LocalTTLCache(maxsize=10, ttl=60)
+    epoch = cache.epoch
+    cache.invalidate("a")  # 回源期间收到失效消息
+    cache.set("a", "old", epoch=epoch)
+    assert cache.get("a") is _MISSING
+
+
+def _counting_loader(values):
+    """依次返回 values 中的值，并记录回源次数"""
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return values[len(calls) - 1]
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_read_through_bump_invalidates_l1_and_redis():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    cache = ReadThroughCache("test_bump", 60, local=LocalTTLCache(maxsize=10, ttl=60))
+    load, calls = _counting_loader(["v1", "v2"])
+
+    assert await cache.get_or_load(redis, "a", load) == "v1"
+    cache.local.clear()  # 跳过 L1，确认 Redis 中也有
+    assert await cache.get_or_load(redis, "a", load) == "v1"
+    assert len(calls) == 1
+
+    await cache.bump(redis, "a")
+    assert await cache.get_or_load(redis, "a", load) == "v2"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_through_bump_during_load_is_not_cached():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    cache = ReadThroughCache("test_race", 60, local=LocalTTLCache(maxsize=10, ttl=60))
+    calls = []
+
+    async def load():
+        calls.append(1)
+        if len(calls) == 1:
+            # 回源期间发生写入：读到的是旧值，之后不能再被命中
+            await cache.bump(redis, "a")
+            return "old"
+        return "new"
+
+    assert await cache.get_or_load(redis, "a", load) == "old"
+    assert await cache.get_or_load(redis, "a", load) == "new"
+
+
+@pytest.mark.asyncio
+async def test_read_through_negative_cache():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    cache = ReadThroughCache("test_negative", 60, negative_ttl=60)
+    load, calls = _counting_loader([None, "created"])
+
+    assert await cache.get_or_load(redis, "missing", load) is None
+    assert await cache.get_or_load(redis, "missing", load) is None
+    assert len(calls) == 1
+
+    await cache.bump(redis, "missing")
+    assert await cache.get_or_load(redis, "missing", load) == "created"
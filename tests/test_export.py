@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+import os
+import sys
+
+import pytest
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.domains.enums import ExportFormat
+from app.tasks.export_reporter import (
+    EXPORT_HEADER,
+    _write_arrow,
+    export_shard_func,
+    export_transactions_by_user_func,
+    merge_export_shards_func,
+    plan_user_shards,
+)
+
+
+def test_plan_user_shards_balanced():
+    totals = [("a", 100), ("b", 60), ("c", 50), ("d", 10), ("e", 0)]
+    shards = plan_user_shards(totals, 2)
+    assert sorted(u for s in shards for u in s) == ["a", "b", "c", "d"]
+    loads = sorted(sum(dict(totals)[u] for u in s) for s in shards)
+    assert loads == [110, 110]
+
+
+def test_plan_user_shards_fewer_users_than_shards():
+    assert plan_user_shards([("a", 5)], 8) == [["a"]]
+    assert plan_user_shards([], 8) == []
+
+
+def test_write_feather_batches_with_different_type_order(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from pyarrow import feather
+
+    def row(tx_id, tx_type):
+        values = {
+            "transaction_id": tx_id,
+            "create_userid": "u1",
+            "amount": Decimal("1.00"),
+            "type": tx_type,
+            "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        }
+        return tuple(values.get(name) for name in EXPORT_HEADER)
+
+    # 两个批次中枚举值出现的顺序不同，逐批编码会触发字典替换
+    batches = [
+        [row("a", "INCOME"), row("b", "EXPENSE")],
+        [row("c", "EXPENSE"), row("d", "INCOME")],
+    ]
+    path = str(tmp_path / "transactions.feather")
+    assert _write_arrow(path, iter(batches), fmt=ExportFormat.FEATHER) == 4
+
+    table = feather.read_table(path)
+    assert table.column("transaction_id").to_pylist() == ["a", "b", "c", "d"]
+    assert table.column("type").to_pylist() == ["INCOME", "EXPENSE", "EXPENSE", "INCOME"]
+
+
+@pytest.fixture
+def ledger_db():
+    """SQLite 内存库，u1 五笔、u2 两笔交易"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.models import ModelBase, Transaction
+    from app.domains.enums import TransactionType
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    ModelBase.metadata.create_all(engine)
+    session = Session(engine)
+    for userid, count in (("u1", 5), ("u2", 2)):
+        for i in range(count):
+            session.add(Transaction(
+                transaction_id=f"{userid}-{i}",
+                create_userid=userid,
+                amount=Decimal("1.00"),
+                type=TransactionType.INCOME,
+                created_at=datetime(2025, 1, 1, 0, 0, i, tzinfo=timezone.utc),
+            ))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_export_streams_in_batches(ledger_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    progress = []
+    result = export_transactions_by_user_func(
+        ledger_db, "u1", ExportFormat.CSV, progress=lambda done, total: progress.append(done), batch_size=2,
+    )
+    assert result["rows"] == 5
+    # 每取一批上报一次进度：2 + 2 + 1
+    assert progress == [2, 4, 5]
+    with open(result["path"], encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+    assert lines[0].split(",") == EXPORT_HEADER
+    assert len(lines) == 6
+
+
+def test_sharded_export_merges_csv_with_one_header(ledger_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parts = [
+        export_shard_func(ledger_db, "job", i, user_ids, ExportFormat.CSV)
+        for i, user_ids in enumerate([["u2"], ["u1"]])
+    ]
+    merged = merge_export_shards_func("job", ExportFormat.CSV, parts)
+    assert merged["rows"] == 7
+    with open(merged["path"], encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+    assert lines.count(",".join(EXPORT_HEADER)) == 1
+    assert len(lines) == 8
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.core import export_registry
+from app.core.export_registry import dispatch_export
+from app.domains.enums import ExportFormat
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """替换投递到 broker 的调用，记录提交的 task_id"""
+    task_ids = []
+    monkeypatch.setattr(
+        export_registry.export_transactions_by_user_task,
+        "apply_async",
+        lambda *args, task_id=None, **kwargs: task_ids.append(task_id),
+    )
+    return task_ids
+
+
+class _LostRaceRedis(fakeredis.aioredis.FakeRedis):
+    """第一次 SET NX 失败，且随后读不到对方的登记：模拟对方的 key 恰好过期"""
+
+    lost = False
+
+    async def set(self, *args, **kwargs):
+        if kwargs.get("nx") and not self.lost:
+            self.lost = True
+            return None
+        return await super().set(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_export_retries_when_winner_key_vanishes(submitted):
+    redis = _LostRaceRedis(decode_responses=True)
+    data = await dispatch_export(redis, "u1", ExportFormat.CSV, "1-0-1")
+    assert data["task_id"] is not None
+    assert submitted == [data["task_id"]]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_export_coalesces_concurrent_requests(submitted, monkeypatch):
+    monkeypatch.setattr(
+        export_registry.export_transactions_by_user_task,
+        "AsyncResult",
+        lambda task_id: SimpleNamespace(state="PENDING", info=None),
+    )
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    results = await asyncio.gather(*(
+        dispatch_export(redis, "u1", ExportFormat.CSV, "1-0-1") for _ in range(5)
+    ))
+    # 同一个水位的并发请求只投递一个任务，全部拿到同一个 task_id
+    assert len(submitted) == 1
+    assert {r["task_id"] for r in results} == set(submitted)
+
+    # 数据变化后水位不同，重新导出
+    data = await dispatch_export(redis, "u1", ExportFormat.CSV, "2-0-2")
+    assert len(submitted) == 2 and data["task_id"] == submitted[1]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_export_redispatches_when_artifact_missing(submitted, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        export_registry.export_transactions_by_user_task,
+        "AsyncResult",
+        lambda task_id: SimpleNamespace(state="SUCCESS", info={"path": str(tmp_path / "gone.csv")}),
+    )
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    first = await dispatch_export(redis, "u1", ExportFormat.CSV, "1-0-1")
+    # 任务已成功但文件已被清理：不能复用，需重新投递
+    second = await dispatch_export(redis, "u1", ExportFormat.CSV, "1-0-1")
+    assert second["task_id"] != first["task_id"]
+    assert submitted == [first["task_id"], second["task_id"]]
@@ -0,0 +1,78 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.core.exceptions import BizException
+from app.core.pagination import decode_keyset, encode_keyset
+
+
+def test_keyset_roundtrip():
+    ts = datetime(2025, 11, 20, 17, 21, 22, 214584, tzinfo=timezone.utc)
+    token = encode_keyset(ts, "a" * 32)
+    assert "=" not in token
+    assert decode_keyset(token) == (ts, "a" * 32)
+
+
+def test_keyset_invalid_token():
+    with pytest.raises(BizException) as exc:
+        decode_keyset("not-a-cursor")
+    assert exc.value.code == 400
+
+
+def test_batch_rows_keep_submission_order():
+    from app.db.transaction_repo import build_transaction_rows
+    from app.schemas.transactions import TransactionCreate
+
+    now = datetime(2025, 11, 20, 17, 21, 22, tzinfo=timezone.utc)
+    items = [TransactionCreate(amount="1", remark=str(i), filelist=[]) for i in range(3)]
+    rows = build_transaction_rows(items, "u1", now)
+    # 同一批次的 created_at 严格递增，按 (created_at, transaction_id) 排序即提交顺序
+    ordered = sorted(rows, key=lambda r: (r["created_at"], r["transaction_id"]))
+    assert [r["remark"] for r in ordered] == ["0", "1", "2"]
+    assert rows[0]["created_at"] == now
+
+
+def test_snapshot_pages_ignore_rows_added_between_pages():
+    from decimal import Decimal
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.models import ModelBase, Transaction
+    from app.db.transaction_repo import build_snapshot_filter, build_windowed_page
+    from app.domains.enums import TransactionType
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    ModelBase.metadata.create_all(engine)
+
+    def add(session, i):
+        session.add(Transaction(
+            transaction_id=f"t{i}", create_userid="u1", amount=Decimal("1.00"), type=TransactionType.INCOME,
+            created_at=datetime(2025, 1, 1, 0, 0, i, tzinfo=timezone.utc),
+        ))
+        session.commit()
+
+    def page(session, conds, offset):
+        rows = session.execute(build_windowed_page(conds, "u1", offset, 2)).all()
+        return [row[0] for row in rows], rows[0].total
+
+    with Session(engine) as session:
+        for i in range(5):
+            add(session, i)
+        conds = [Transaction.create_userid == "u1"]
+        first, _ = page(session, conds, 0)
+        snapshot = conds + [build_snapshot_filter((first[0].created_at, first[0].transaction_id))]
+
+        add(session, 9)  # 翻页期间新增的记录，不能把第一页的数据挤到第二页
+        second, total = page(session, snapshot, 2)
+        assert [t.transaction_id for t in first + second] == ["t4", "t3", "t2", "t1"]
+        assert total == 5
+    engine.dispose()
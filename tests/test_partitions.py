@@ -0,0 +1,93 @@
+import os
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.core.config import settings
+from app.db.partitions import create_month_partition, detach_expired_partitions, list_partitions
+from app.db.transaction_repo import build_daily_upsert, build_summary_upsert, daily_delta_rows, summary_delta
+from app.domains.enums import TransactionType
+
+# 分区维护只支持 PostgreSQL，需要已执行 alembic upgrade head 的库（CI 中即 DATABASE_URL）
+if not settings.DATABASE_URL.startswith("postgresql"):
+    pytest.skip("分区测试需要 PostgreSQL", allow_module_level=True)
+
+ARCHIVE_SCHEMA = "archive_test"
+MONTH = date(2001, 1, 1)
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"数据库不可用: {e}")
+    # 整个用例在一个事务里执行，结束时回滚，不在库里留下分区或数据
+    trans = connection.begin()
+    try:
+        yield connection
+    finally:
+        trans.rollback()
+        connection.close()
+        engine.dispose()
+
+
+def _add(conn, userid: str, tx_id: str, created_at: datetime, tx_type: TransactionType, amount: Decimal) -> None:
+    conn.execute(text("""
+        INSERT INTO transactions (transaction_id, create_userid, amount, type, created_at)
+        VALUES (:id, :uid, :amount, :type, :created_at)
+    """), {"id": tx_id, "uid": userid, "amount": amount, "type": tx_type.value, "created_at": created_at})
+    conn.execute(build_summary_upsert("postgresql", userid, *summary_delta(tx_type, amount)))
+    conn.execute(build_daily_upsert("postgresql", daily_delta_rows(userid, [(created_at, tx_type, amount, 1)])))
+
+
+def test_month_partition_move_and_archive(conn):
+    if f"transactions_p{MONTH:%Y%m}" in list_partitions(conn, "transactions"):
+        pytest.skip("测试月份的分区已存在")
+    # 非 UTC 会话：分区边界与搬迁条件仍按 UTC 计算
+    conn.execute(text("SET LOCAL TimeZone = 'Asia/Shanghai'"))
+
+    userid = uuid4().hex
+    conn.execute(text(
+        "INSERT INTO users (userid, username, password_hash, status) VALUES (:uid, :name, 'x', 'ACTIVE')"
+    ), {"uid": userid, "name": f"partition_{userid[:8]}"})
+    # 2001-01-31 23:30 UTC 在上海时区已是 2 月，仍属于 UTC 1 月分区
+    _add(conn, userid, "p1" + userid[:30], datetime(2001, 1, 31, 23, 30, tzinfo=timezone.utc), TransactionType.INCOME, Decimal("10.00"))
+    _add(conn, userid, "p2" + userid[:30], datetime(2001, 1, 2, tzinfo=timezone.utc), TransactionType.EXPENSE, Decimal("4.00"))
+    _add(conn, userid, "p3" + userid[:30], datetime.now(timezone.utc), TransactionType.INCOME, Decimal("1.00"))
+
+    assert create_month_partition(conn, "transactions", MONTH) is True
+    name = f"transactions_p{MONTH:%Y%m}"
+    assert conn.execute(text(f"SELECT count(*) FROM {name} WHERE create_userid = :uid"), {"uid": userid}).scalar() == 2
+    # 从默认分区搬走时删除的键已补回，全局唯一仍然生效
+    assert conn.execute(text(
+        "SELECT count(*) FROM transaction_keys WHERE transaction_id IN (:a, :b)"
+    ), {"a": "p1" + userid[:30], "b": "p2" + userid[:30]}).scalar() == 2
+    with pytest.raises(IntegrityError), conn.begin_nested():
+        _add(conn, userid, "p1" + userid[:30], datetime.now(timezone.utc), TransactionType.INCOME, Decimal("1.00"))
+
+    archived = detach_expired_partitions(conn, 12, ARCHIVE_SCHEMA, settings.STATS_TIMEZONE, tables=["transactions"])
+    assert name in archived["detached"]
+    assert userid in archived["users"]
+    assert name not in list_partitions(conn, "transactions")
+
+    # 汇总与日汇总只剩仍可查询的那一条
+    totals = conn.execute(text(
+        "SELECT total_transactions, total_income, total_expense FROM user_transaction_totals WHERE userid = :uid"
+    ), {"uid": userid}).one()
+    assert tuple(totals) == (1, Decimal("1.00"), Decimal("0.00"))
+    daily = conn.execute(text(
+        "SELECT coalesce(sum(total_count), 0) FROM user_transaction_daily WHERE userid = :uid"
+    ), {"uid": userid}).scalar()
+    assert daily == 1
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.core.permissions import ResourceEntry, build_permission_index
+from app.domains.enums import ResourceType
+
+
+def _res(rid, rcode, rtype=ResourceType.MENU, parent_id=None, sort=0, status=1):
+    return ResourceEntry(rid=rid, rname=rcode, rcode=rcode, rtype=rtype, parent_id=parent_id, sort=sort, status=status)
+
+
+RESOURCES = [
+    _res("m1", "bill"),
+    _res("b1", "bill:delete", ResourceType.BUTTON, "m1", sort=2),
+    _res("b2", "bill:add", ResourceType.BUTTON, "m1", sort=1),
+    _res("b3", "bill:export_all", ResourceType.BUTTON, "m1", status=0),
+]
+
+
+def test_permission_index_codes_and_buttons():
+    grants = [("r1", "m1"), ("r1", "b1"), ("r1", "b2"), ("r1", "b3"), ("r2", "b1")]
+    index = build_permission_index("3", RESOURCES, grants)
+
+    assert index.allows("r1", "bill:delete")
+    # 停用的资源即使有授权也不生效
+    assert not index.allows("r1", "bill:export_all")
+    assert not index.allows("r2", "bill:add")
+    assert not index.allows(None, "bill")
+    assert [b.rcode for b in index.granted_buttons("r1", "bill")] == ["bill:add", "bill:delete"]
+    assert index.resource_by_code("bill:export_all").rid == "b3"
+
+
+def test_permission_index_menu_tree_requires_granted_ancestors():
+    resources = RESOURCES + [
+        _res("m2", "report", sort=1),
+        _res("m3", "report:daily", parent_id="m2"),
+        _res("m4", "bill:list", parent_id="m1"),
+    ]
+    index = build_permission_index("1", resources, [("r1", "m1"), ("r1", "m4"), ("r1", "m3")])
+
+    tree = index.menu_tree("r1")
+    # m3 的父菜单 m2 未授权，整个分支不可见
+    assert [node["code"] for node in tree] == ["bill"]
+    assert [child["code"] for child in tree[0]["children"]] == ["bill:list"]
+    assert index.menu_tree("nobody") == []
@@ -0,0 +1,31 @@
+import os
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.db.transaction_repo import bucket_start, fill_stats_buckets
+from app.domains.enums import StatsGranularity
+
+
+def _row(period, income, expense, count):
+    return SimpleNamespace(period=period, income=income, expense=expense, count=count)
+
+
+def test_fill_stats_buckets_month_fills_gaps():
+    rows = [
+        _row(date(2025, 1, 1), 100, 30, 3),
+        _row(date(2025, 3, 1), 0, 5, 1),
+    ]
+    items = fill_stats_buckets(rows, StatsGranularity.MONTH, date(2025, 1, 1), date(2025, 3, 31))
+    assert [b["period"] for b in items] == [date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+    assert items[0] == {"period": date(2025, 1, 1), "income": 100, "expense": 30, "count": 3}
+    assert items[1]["count"] == 0
+
+
+def test_bucket_start_week_starts_monday():
+    assert bucket_start(date(2025, 1, 5), StatsGranularity.WEEK) == date(2024, 12, 30)  # 周日
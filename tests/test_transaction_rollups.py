@@ -0,0 +1,57 @@
+import os
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+# 确保能导入项目模块
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.db.models import ModelBase, Transaction, UserTransactionDaily, UserTransactionSummary
+from app.db.transaction_repo import build_daily_upsert, build_summary_upsert, daily_delta_rows, stats_day, summary_delta
+from app.domains.enums import TransactionType
+from app.routers.transactions import _delete_with_rollups
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(ModelBase.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+CREATED_AT = datetime(2025, 1, 1, 8, tzinfo=timezone.utc)
+
+
+async def _add(db: AsyncSession, tx_id: str, tx_type: TransactionType, amount: Decimal) -> None:
+    created_at = CREATED_AT
+    db.add(Transaction(transaction_id=tx_id, create_userid="u1", type=tx_type, amount=amount, created_at=created_at))
+    await db.execute(build_summary_upsert("sqlite", "u1", *summary_delta(tx_type, amount)))
+    await db.execute(build_daily_upsert("sqlite", daily_delta_rows("u1", [(created_at, tx_type, amount, 1)])))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_second_delete_leaves_rollups_unchanged(db):
+    await _add(db, "t1", TransactionType.INCOME, Decimal("10.00"))
+    await _add(db, "t2", TransactionType.EXPENSE, Decimal("3.00"))
+
+    assert await _delete_with_rollups(db, "t1") is True
+    await db.commit()
+    # 并发删除的另一方：记录已不存在，不能再扣减一次
+    assert await _delete_with_rollups(db, "t1") is False
+    await db.commit()
+
+    summary = await db.get(UserTransactionSummary, "u1", populate_existing=True)
+    assert (summary.total_transactions, summary.total_income, summary.total_expense) == (1, Decimal("0.00"), Decimal("3.00"))
+    income_day = await db.get(UserTransactionDaily, ("u1", stats_day(CREATED_AT), TransactionType.INCOME), populate_existing=True)
+    assert income_day.total_count == 0